@@ -23,10 +23,12 @@ celery_app.conf.update(
     timezone="America/Toronto", 
     enable_utc=True,
     result_expires=3600,
+    # Map extractions run for tens of seconds: reserve one task at a time so
+    # queued work goes to an idle worker instead of waiting behind a busy one
+    worker_prefetch_multiplier=1,
     task_routes={
         "app.tasks.process_map": {"queue": "maps"},
+        "app.tasks.process_map_extraction": {"queue": "maps"},
         "app.tasks.*": {"queue": "default"},
     },
 )
-
-celery_app.autodiscover_tasks()
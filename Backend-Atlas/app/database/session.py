@@ -9,7 +9,8 @@ load_dotenv(dotenv_path=".env.dev")
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Connections outlive single tasks in the workers: check them before reuse
+engine = create_async_engine(DATABASE_URL, echo=True, pool_pre_ping=True)
 
 AsyncSessionLocal = sessionmaker( 
     bind=engine,
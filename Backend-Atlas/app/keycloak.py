@@ -1,6 +1,7 @@
 from keycloak import KeycloakOpenID
 from dotenv import load_dotenv
 import os
+import time
 from jose import jwt, JWTError
 import textwrap
 
@@ -18,9 +19,18 @@ def format_public_key(raw_key: str) -> str:
     wrapped = "\n".join(textwrap.wrap(raw_key, 64))
     return f"-----BEGIN PUBLIC KEY-----\n{wrapped}\n-----END PUBLIC KEY-----"
 
+# The realm key is fetched over HTTP: keep it for a while instead of
+# requesting it on every authenticated call. Rotations are picked up on expiry.
+PUBLIC_KEY_TTL_SECONDS = 300
+_public_key_cache: tuple[str, float] | None = None
+
 def get_keycloak_public_key():
-    raw_key = keycloak_open_id.public_key()
-    return format_public_key(raw_key)
+    global _public_key_cache
+    now = time.monotonic()
+    if _public_key_cache is None or now - _public_key_cache[1] > PUBLIC_KEY_TTL_SECONDS:
+        raw_key = keycloak_open_id.public_key()
+        _public_key_cache = (format_public_key(raw_key), now)
+    return _public_key_cache[0]
 
 def verify_token(token: str):
     try:
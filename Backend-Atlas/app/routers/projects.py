@@ -10,6 +10,7 @@ import cv2
 import numpy as np
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile, Body
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy import delete, not_, select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
@@ -33,6 +34,7 @@ from app.utils.update_feature import (
     normalize_feature_collection,
     serialize_feature_rows,
 )
+from app.utils.file_utils import encode_grayscale_png
 from app.utils.sift_key_points_finder import find_coastline_keypoints
 
 from ..celery_app import celery_app
@@ -371,21 +373,37 @@ async def upload_and_process_map(
     if len(file_content) == 0:
         raise HTTPException(status_code=400, detail="Empty file")
 
+    # OCR only needs luminance: ship a grayscale PNG to the broker when the
+    # worker has no colour-dependent extraction to run.
+    if enable_text_extraction and not (
+        enable_color_extraction or enable_shapes_extraction
+    ):
+        # Decoding and re-encoding is CPU-bound, keep it off the event loop
+        file_content = (
+            await run_in_threadpool(encode_grayscale_png, file_content)
+            or file_content
+        )
+
     try:
-        task = process_map_extraction.delay(
-            filename=file.filename,
-            file_content=file_content,
-            project_id=map_obj.project_id,
-            map_id=map_id,
-            pixel_points=pixel_points_list,
-            geo_points_lonlat=geo_points_list,
-            enable_color_extraction=enable_color_extraction,
-            enable_shapes_extraction=enable_shapes_extraction,
-            enable_text_extraction=enable_text_extraction,
-            legend_bounds=legend_bounds_dict,
-            imposed_click_positions=imposed_click_positions,
-            imposed_colors_names=imposed_colors_names,
-            imposed_sampling_radii=imposed_sampling_radii,
+        # The image travels base64-encoded inside the JSON message; compress it
+        # so multi-MB scans don't double in size through the broker.
+        task = process_map_extraction.apply_async(
+            kwargs=dict(
+                filename=file.filename,
+                file_content=file_content,
+                project_id=map_obj.project_id,
+                map_id=map_id,
+                pixel_points=pixel_points_list,
+                geo_points_lonlat=geo_points_list,
+                enable_color_extraction=enable_color_extraction,
+                enable_shapes_extraction=enable_shapes_extraction,
+                enable_text_extraction=enable_text_extraction,
+                legend_bounds=legend_bounds_dict,
+                imposed_click_positions=imposed_click_positions,
+                imposed_colors_names=imposed_colors_names,
+                imposed_sampling_radii=imposed_sampling_radii,
+            ),
+            compression="zlib",
         )
         # TODO: either delete the created map if task fails or create cleanup mechanism
 
@@ -1,17 +1,18 @@
+import json
+import uuid
 from typing import Any
 from uuid import UUID
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.features import Feature
 from app.models.map import Map
 from app.models.project import Project
 
-async def insert_feature_in_db(
+async def _validate_feature_owner(
     db: AsyncSession,
     map_id: UUID | None,
-    data: dict[str, Any],
     project_id: UUID,
-) -> str:
+) -> UUID:
     project_result = await db.execute(
         select(Project.id).where(Project.id == project_id)
     )
@@ -27,6 +28,17 @@ async def insert_feature_in_db(
         if not allowed_map:
             raise ValueError("Map does not belong to project")
 
+    return resolved_project_id
+
+
+async def insert_feature_in_db(
+    db: AsyncSession,
+    map_id: UUID | None,
+    data: dict[str, Any],
+    project_id: UUID,
+) -> str:
+    resolved_project_id = await _validate_feature_owner(db, map_id, project_id)
+
     feature = Feature(
         project_id=resolved_project_id,
         map_id=map_id,
@@ -39,4 +51,55 @@ async def insert_feature_in_db(
         await db.rollback()
         raise
     await db.refresh(feature)
-    return str(feature.id)
\ No newline at end of file
+    return str(feature.id)
+
+
+async def insert_features_bulk(
+    db: AsyncSession,
+    map_id: UUID | None,
+    data: list[dict[str, Any]],
+    project_id: UUID,
+) -> list[str]:
+    """Insert many features for one map with a single COPY round-trip.
+
+    Ownership is validated once for the whole batch instead of per row.
+    Drivers other than psycopg have no COPY API and fall back to one
+    multi-row INSERT.
+    """
+    if not data:
+        return []
+
+    resolved_project_id = await _validate_feature_owner(db, map_id, project_id)
+    feature_ids = [uuid.uuid4() for _ in data]
+
+    connection = await db.connection()
+    try:
+        if connection.dialect.driver == "psycopg":
+            raw_connection = await connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            async with driver_connection.cursor() as cursor:
+                async with cursor.copy(
+                    f"COPY {Feature.__tablename__} (id, project_id, map_id, data) FROM STDIN"
+                ) as copy:
+                    for feature_id, feature_data in zip(feature_ids, data):
+                        await copy.write_row(
+                            (feature_id, resolved_project_id, map_id, json.dumps(feature_data))
+                        )
+        else:
+            await db.execute(
+                insert(Feature),
+                [
+                    {
+                        "id": feature_id,
+                        "project_id": resolved_project_id,
+                        "map_id": map_id,
+                        "data": feature_data,
+                    }
+                    for feature_id, feature_data in zip(feature_ids, data)
+                ],
+            )
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise
+    return [str(feature_id) for feature_id in feature_ids]
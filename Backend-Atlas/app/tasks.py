@@ -2,19 +2,26 @@ import asyncio
 import logging
 import os
 import re
-import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
+from pathlib import Path
 from typing import Any, List
 from uuid import UUID
 
 import cv2
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.session import AsyncSessionLocal
-from app.services.features import insert_feature_in_db
-from app.utils.cities_validation import find_first_city
+from app.services.features import insert_feature_in_db, insert_features_bulk
+from app.utils.cities_validation import find_cities_batch
 from app.utils.color_extraction import extract_colors
-from app.utils.file_utils import validate_file_extension
+from app.utils.file_utils import (
+    has_image_signature,
+    validate_file_extension,
+    write_text_file,
+)
 from app.utils.georeferencingSift import georeference_features_with_sift_points
 from app.utils.shapes_extraction import extract_shapes
 from app.utils.text_extraction import extract_text
@@ -23,30 +30,67 @@ from .celery_app import celery_app
 
 logger = logging.getLogger(__name__)
 
-nb_task = 6
+nb_task = 5
 
 # TODO : maybe remove this debud parameter pour l'instant j'aimerais ca le garder tho
 ENABLE_COASTLINE_SNAPPING = True
 
+# City candidates: words of 3+ characters starting with a letter. Short and
+# numeric OCR noise is dropped by the regex engine itself.
+_TOKEN_RE = re.compile(r"\b[^\W\d_][\w\-']{2,}\b")
+
+# Debug pacing for test_task so progress updates can be watched in Flower
+TEST_TASK_SLOW = os.getenv("ATLAS_TEST_SLOW") == "1"
+
+# Colour layers are extracted on a copy downscaled to this long side (px)
+COLOR_EXTRACTION_MAX_SIDE = 3000
+
+# OCR languages and device, the reader is loaded on first OCR use and then
+# reused by the worker process
+OCR_LANGUAGES = ["en", "fr"]
+OCR_GPU = os.getenv("ATLAS_OCR_GPU") == "1"
+
+# Resolved once per worker process instead of on every task run
+_OUTPUT_DIR = Path(__file__).resolve().parent / "extracted_texts"
+try:
+    _OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+except OSError as e:
+    logger.error("[ERROR] Failed to create directory %s: %s", _OUTPUT_DIR, e)
+
+
+# One event loop per worker process: the async engine's pooled connections
+# are bound to the loop that opened them, so it must outlive a single call.
+_event_loop: asyncio.AbstractEventLoop | None = None
+
+
+def _run_async(coro):
+    """Run a coroutine to completion on the worker process's event loop."""
+    global _event_loop
+    if _event_loop is None or _event_loop.is_closed():
+        _event_loop = asyncio.new_event_loop()
+    return _event_loop.run_until_complete(coro)
+
+
+def _report_progress(task, step: int, status: str) -> None:
+    """Publish the task's current pipeline step to the result backend."""
+    task.update_state(
+        state="PROGRESS",
+        meta={"current": step, "total": nb_task, "status": status},
+    )
+
 
 @celery_app.task(bind=True)
 def test_task(self, name: str = "World"):
     """simple test task"""
-    logger.info(f"Starting test task for {name}")
+    logger.info("Starting test task for %s", name)
 
     for i in range(5):
-        time.sleep(1)
-        self.update_state(
-            state="PROGRESS",
-            meta={
-                "current": i + 1,
-                "total": nb_task,
-                "status": f"Processing step {i + 1}",
-            },
-        )
+        if TEST_TASK_SLOW:
+            time.sleep(1)
+        _report_progress(self, i + 1, f"Processing step {i + 1}")
 
     result = f"Hello {name}! Task completed successfully."
-    logger.info(f"Test task completed: {result}")
+    logger.info("Test task completed: %s", result)
     return result
 
 
@@ -67,129 +111,153 @@ def process_map_extraction(
     imposed_colors_names: list | None = None,
     imposed_sampling_radii: list | None = None,
 ):
+    # A single session is shared by every persistence step of this task
+    db = AsyncSessionLocal()
+    # One worker for the click-colour job and one for the text file write, so
+    # the write never queues behind colour extraction
+    executor = ThreadPoolExecutor(max_workers=2)
+    color_future = None
     try:
-        # Step 1: temp save
-        self.update_state(
-            state="PROGRESS",
-            meta={"current": 1, "total": nb_task, "status": "Saving uploaded file"},
-        )
-        time.sleep(2)
-
-        with tempfile.NamedTemporaryFile(
-            delete=False, suffix=os.path.splitext(filename)[1]
-        ) as tmp_file:
-            tmp_file.write(file_content)
-            tmp_file_path = tmp_file.name
-
-        # Step 2: opening the picture
-        self.update_state(
-            state="PROGRESS",
-            meta={
-                "current": 2,
-                "total": nb_task,
-                "status": "Loading and validating image",
-            },
-        )
+        base_name, ext = os.path.splitext(os.path.basename(filename))
+        ext = ext.lower()
 
-        image = cv2.imread(tmp_file_path)
-        image.flags.writeable = False  # Makes image immutable
-        if not validate_file_extension(tmp_file_path):
-            ext = os.path.splitext(tmp_file_path)[1].lower()
+        # Reject unsupported uploads before touching the decoder
+        if not validate_file_extension(filename):
             raise ValueError(f"Extension {ext} is not allowed.")
+        # Text-only uploads are re-encoded to PNG by the API, so any supported
+        # signature is accepted regardless of the extension
+        if not has_image_signature(file_content):
+            raise ValueError(f"File {filename} is not a PNG or JPEG image.")
+
+        # Step 1: opening the picture
+        _report_progress(self, 1, "Loading and validating image")
+
+        # Decoded once, straight from the task payload, and shared by every
+        # extraction step. Text-only jobs are uploaded as grayscale, the others
+        # keep their alpha channel for colours.
+        text_only = not (enable_color_extraction or enable_shapes_extraction)
+        image = cv2.imdecode(
+            np.frombuffer(file_content, dtype=np.uint8),
+            cv2.IMREAD_GRAYSCALE if text_only else cv2.IMREAD_UNCHANGED,
+        )
+        if image is None:
+            raise ValueError(f"Could not decode image {filename}.")
+        # Shared read-only with the colour extraction thread, see below
+        image.flags.writeable = False
+
+        imposed_click_positions_tuples = (
+            [tuple(c) for c in imposed_click_positions]
+            if imposed_click_positions
+            else None
+        )
 
-        # Step 3: Extraction OCR
-        self.update_state(
-            state="PROGRESS",
-            meta={
-                "current": 3,
-                "total": nb_task,
-                "status": "Extracting text with EasyOCR",
-            },
+        imposed_sampling_radii_ints = (
+            [int(r) for r in imposed_sampling_radii]
+            if imposed_sampling_radii
+            else None
         )
 
+        # Colours sampled at user clicks don't depend on OCR or shapes: start
+        # them now so they overlap with the other extraction steps.
+        if enable_color_extraction and imposed_click_positions_tuples:
+            color_future = executor.submit(
+                extract_colors,
+                image,
+                debug=False,
+                imposed_click_positions=imposed_click_positions_tuples,
+                imposed_colors_names=imposed_colors_names,
+                imposed_sampling_radii=imposed_sampling_radii_ints,
+                max_working_side=COLOR_EXTRACTION_MAX_SIDE,
+            )
+
+        # Step 2: Extraction OCR
+        _report_progress(self, 2, "Extracting text with EasyOCR")
+
         if enable_text_extraction:
             # GPU acceleration make the text extraction MUCH faster i
             extracted_text, clean_image = extract_text(
-                image=image, languages=["en", "fr"], gpu_acc=False
+                image=image, languages=OCR_LANGUAGES, gpu_acc=OCR_GPU
             )
 
+            del clean_image
             text_regions = [block[0] for block in extracted_text]
+            # Joined once, shared by the text file and the city detection
+            full_text = "\n".join(text for _, text, _ in extracted_text)
+
+            # The text file only needs the OCR output: write it on its own
+            # executor worker so the disk I/O overlaps with the remaining steps.
+            now = datetime.now()
+            timestamp = now.strftime("%Y%m%d_%H%M%S")
+            output_path = str(_OUTPUT_DIR / f"{timestamp}_{base_name}.txt")
+            header = (
+                "=== OCR EXTRACTION  ===\n"
+                f"Source File: {filename}\n"
+                f"Date extraction: {now:%Y-%m-%d %H:%M:%S}\n"
+                "\n=== TEXTE EXTRAIT ===\n\n"
+            )
+            text_write_future = executor.submit(
+                write_text_file,
+                output_path,
+                header + full_text,
+            )
 
             # TODO : Amener ca dans la fonction de detection de texte ===========================================================
             # Tokenize OCR text to single words and run city detection per token
             try:
-                # Extract just the text strings from the list of tuples [(coords, text, prob), ...]
-                text_strings = [block[1] for block in extracted_text]
-                full_text = " ".join(text_strings)
-                tokens = re.findall(r"\b[\w\-']+\b", full_text)
-                for tok in tokens:
-                    try:
-                        candidate = find_first_city(tok)
-                    except Exception as e:
-                        logger.debug(f"find_first_city error for token '{tok}': {e}")
-                        # treat as not found but persist the token
-                        candidate = {
-                            "found": False,
-                            "query": tok,
-                            "name": tok,
-                            "lat": 0.0,
-                            "lon": 0.0,
-                        }
-
-                    # Build feature using returned candidate; if not found, coordinates will be 0,0
-                    city_feature = {
-                        "type": "Feature",
-                        "properties": {
-                            "name": candidate.get("name") or tok,
-                            "show": bool(candidate.get("found")),
-                            "mapElementType": "point",
-                            "color_name": "black",
-                            "color_rgb": [0, 0, 0],
-                        },
-                        "geometry": {
-                            "type": "Point",
-                            "coordinates": [
-                                candidate.get("lon") or 0.0,
-                                candidate.get("lat") or 0.0,
-                            ],
-                        },
-                    }
-
-                    city_feature_collection = {
+                # Cities are proper nouns: skip lowercase tokens and look each
+                # distinct token up only once, ignoring case
+                candidate_tokens: dict[str, str] = {}
+                for tok in _TOKEN_RE.findall(full_text):
+                    if tok[0].isupper():
+                        candidate_tokens.setdefault(tok.casefold(), tok)
+
+                # Blank or noise-only OCR output has nothing to look up
+                cities = (
+                    find_cities_batch(candidate_tokens.values())
+                    if candidate_tokens
+                    else {}
+                )
+                # Only matched cities are stored, unmatched words are OCR noise.
+                # Spellings that differ by accents only ("Quebec", "Québec")
+                # resolve to the same city, which is stored once.
+                resolved_cities: dict[tuple, tuple[str, dict[str, Any]]] = {}
+                for tok, candidate in cities.items():
+                    if candidate.get("found"):
+                        city_key = (
+                            candidate.get("name"),
+                            candidate.get("lat"),
+                            candidate.get("lon"),
+                        )
+                        resolved_cities.setdefault(city_key, (tok, candidate))
+                city_feature_collections = [
+                    {
                         "type": "FeatureCollection",
-                        "features": [city_feature],
+                        "features": [_build_city_feature(tok, candidate)],
                     }
+                    for tok, candidate in resolved_cities.values()
+                ]
 
-                    try:
-                        asyncio.run(
-                            persist_city_feature(
-                                project_id, map_id, city_feature_collection
-                            )
+                if city_feature_collections:
+                    _run_async(
+                        persist_features(
+                            db, project_id, map_id, city_feature_collections
                         )
-                    except Exception as e:
-                        logger.error(f"Failed to persist city token '{tok}': {e}")
+                    )
 
             except Exception as e:
-                logger.error(f"City detection failed: {e}")
+                logger.error("City detection failed: %s", e)
 
         else:
             text_regions = None
+            full_text = ""
 
         # TODO : Amener ca dans la fonction de detection de texte ===========================================================
 
-        # Step 4: Shapes Extraction (conditionally enabled)
+        # Step 3: Shapes Extraction (conditionally enabled)
         if enable_shapes_extraction:
-            self.update_state(
-                state="PROGRESS",
-                meta={
-                    "current": 4,
-                    "total": nb_task,
-                    "status": "Extracting shapes from image",
-                },
-            )
-            time.sleep(2)
+            _report_progress(self, 3, "Extracting shapes from image")
             shapes_result = extract_shapes(
-                tmp_file_path,
+                image,
                 text_regions=text_regions,
                 legend_bounds=legend_bounds,
             )
@@ -202,59 +270,42 @@ def process_map_extraction(
                     georef_shape_features = georeference_features_with_sift_points(
                         shape_pixel_features, pixel_points, geo_points_lonlat
                     )
-                    asyncio.run(
-                        persist_features(project_id, map_id, georef_shape_features)
+                    _run_async(
+                        persist_features(db, project_id, map_id, georef_shape_features)
                     )
                 except Exception as e:
                     logger.error(
-                        f"SIFT georeferencing step failed for shapes {map_id}: {e}",
+                        "SIFT georeferencing step failed for shapes %s: %s",
+                        map_id,
+                        e,
                         exc_info=True,
                     )
             elif shape_normalized_features:
-                asyncio.run(
-                    persist_features(project_id, map_id, shape_normalized_features)
+                _run_async(
+                    persist_features(db, project_id, map_id, shape_normalized_features)
                 )
         else:
             logger.info("[DEBUG] Shapes extraction disabled - skipping")
             shapes_result = {}
 
-        # Step 5: Color Extraction (conditionally enabled)
+        # Step 4: Color Extraction (conditionally enabled)
         if enable_color_extraction:
-            self.update_state(
-                state="PROGRESS",
-                meta={
-                    "current": 5,
-                    "total": nb_task,
-                    "status": "Extracting colors from image",
-                },
-            )
+            _report_progress(self, 4, "Extracting colors from image")
 
             legends_shapes = [
                 s for s in shapes_result.get("shapes", []) if s.get("isLegend", False)
             ]
 
-            imposed_click_positions_tuples = (
-                [tuple(c) for c in imposed_click_positions]
-                if imposed_click_positions
-                else None
-            )
-
-            imposed_sampling_radii_ints = (
-                [int(r) for r in imposed_sampling_radii]
-                if imposed_sampling_radii
-                else None
-            )
-
             # If the frontend provided a legend box but shapes extraction was disabled,
             # we still need legend shapes to perform legend-based color extraction.
             if (
-                not imposed_click_positions_tuples
-                and not legends_shapes
+                color_future is None
+                and not enable_shapes_extraction
                 and legend_bounds is not None
             ):
                 try:
                     legend_shapes_result = extract_shapes(
-                        tmp_file_path,
+                        image,
                         text_regions=text_regions,
                         legend_bounds=legend_bounds,
                     )
@@ -265,11 +316,15 @@ def process_map_extraction(
                     ]
                 except Exception as e:
                     logger.error(
-                        f"Legend-only shapes extraction failed for map {map_id}: {e}",
+                        "Legend-only shapes extraction failed for map %s: %s",
+                        map_id,
+                        e,
                         exc_info=True,
                     )
 
-            if not imposed_click_positions_tuples and not legends_shapes:
+            if color_future is not None:
+                color_result = color_future.result()
+            elif not legends_shapes:
                 logger.info(
                     "[DEBUG] Color extraction skipped - no imposed colors provided"
                 )
@@ -280,12 +335,13 @@ def process_map_extraction(
                 }
             else:
                 color_result = extract_colors(
-                    tmp_file_path,
+                    image,
                     debug=False,
-                    legend_shapes=legends_shapes if legends_shapes else None,
-                    imposed_click_positions=imposed_click_positions_tuples,
+                    legend_shapes=legends_shapes,
+                    imposed_click_positions=None,
                     imposed_colors_names=imposed_colors_names,
-                    imposed_sampling_radii=imposed_sampling_radii_ints,
+                    imposed_sampling_radii=None,
+                    max_working_side=COLOR_EXTRACTION_MAX_SIDE,
                 )
             normalized_features = color_result.get("normalized_features", [])
             pixel_features = color_result.get("pixel_features", [])
@@ -300,67 +356,36 @@ def process_map_extraction(
                         geo_points_lonlat,
                         snap_to_coastline=ENABLE_COASTLINE_SNAPPING,
                     )
-                    asyncio.run(persist_features(project_id, map_id, georef_features))
+                    _run_async(persist_features(db, project_id, map_id, georef_features))
 
                 except Exception as e:
                     logger.error(
-                        f"SIFT georeferencing step failed for map {map_id}: {e}",
+                        "SIFT georeferencing step failed for map %s: %s",
+                        map_id,
+                        e,
                         exc_info=True,
                     )
             elif normalized_features:
-                asyncio.run(persist_features(project_id, map_id, normalized_features))
+                _run_async(persist_features(db, project_id, map_id, normalized_features))
         else:
             logger.info("[DEBUG] Color extraction disabled - skipping")
             color_result = {"colors_detected": 0}
 
-        # Step 6: Cleaning
-        self.update_state(
-            state="PROGRESS",
-            meta={
-                "current": 6,
-                "total": nb_task,
-                "status": "Cleaning up and finalizing",
-            },
-        )
-        os.unlink(tmp_file_path)
+        del image
 
+        # Step 5: Cleaning
+        _report_progress(self, 5, "Cleaning up and finalizing")
         if enable_text_extraction:
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            output_dir = os.path.join(current_dir, "extracted_texts")
             try:
-                os.makedirs(output_dir, exist_ok=True)
-                logger.info(
-                    f"[DEBUG] Directory created or already exists: {output_dir}"
-                )
-            except Exception as e:
-                logger.error(f"[ERROR] Failed to create directory {output_dir}: {e}")
-
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            base_name = os.path.splitext(filename)[0]
-            output_filename = f"{timestamp}_{base_name}.txt"
-            output_path = os.path.join(output_dir, output_filename)
-
-            lines = [block[1] for block in extracted_text]
-            full_text = "\n".join(lines)
-            try:
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write("=== OCR EXTRACTION  ===\n")
-                    f.write(f"Source File: {filename}\n")
-                    f.write(
-                        f"Date extraction: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n"
-                    )
-                    f.write("\n=== TEXTE EXTRAIT ===\n\n")
-                    f.write(full_text)
-
-                logger.info(f"Text saved to: {output_path}")
+                text_write_future.result()
+                logger.info("Text saved to: %s", output_path)
 
             except Exception as e:
-                logger.error(f"Failed to save text file: {str(e)}")
+                logger.error("Failed to save text file: %s", e)
                 output_path = f"ERROR: Could not save to {output_path}"
 
         result = {
             "filename": filename,
-            # "extracted_text": lines,
             "output_path": output_path if enable_text_extraction else "",
             "shapes_result": shapes_result if enable_shapes_extraction else {},
             "color_result": color_result
@@ -375,54 +400,86 @@ def process_map_extraction(
             },
         }
 
-        logger.info(f"Map processing completed for {filename}: 0 characters extracted")
+        logger.info(
+            "Map processing completed for %s: %d characters extracted",
+            filename,
+            len(full_text),
+        )
 
         return result
 
     except Exception as e:
-        if "tmp_file_path" in locals():
-            try:
-                os.unlink(tmp_file_path)
-            except:
-                pass
-
-        logger.error(f"Error processing map {filename}: {str(e)}")
+        logger.error("Error processing map %s: %s", filename, e)
+        # A colour job that already started can't be interrupted: wait for it
+        # so it doesn't keep running alongside the worker's next task.
+        if color_future is not None and not color_future.cancel():
+            wait([color_future])
         raise e
 
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        _run_async(db.close())
+
+
+def _build_city_feature(token: str, candidate: dict[str, Any]) -> dict[str, Any]:
+    """GeoJSON point for an OCR token matched against the gazetteer."""
+    return {
+        "type": "Feature",
+        "properties": {
+            "name": candidate.get("name") or token,
+            "show": bool(candidate.get("found")),
+            "mapElementType": "point",
+            "color_name": "black",
+            "color_rgb": [0, 0, 0],
+        },
+        "geometry": {
+            "type": "Point",
+            "coordinates": [
+                candidate.get("lon") or 0.0,
+                candidate.get("lat") or 0.0,
+            ],
+        },
+    }
+
 
 async def persist_features(
+    db: AsyncSession,
     project_id: UUID,
     map_id: UUID,
     normalized_features: List[dict[str, Any]],
 ):
-    async with AsyncSessionLocal() as db:
-        for feature_collection in normalized_features:
-            for feature in feature_collection.get("features", []):
-                feature_data = {
-                    "type": "FeatureCollection",
-                    "features": [feature],
-                }
-                try:
-                    await insert_feature_in_db(
-                        db=db,
-                        map_id=map_id,
-                        data=feature_data,
-                        project_id=project_id,
-                    )
-                except Exception as e:
-                    logger.error(
-                        f"Failed to persist individual feature for map {map_id}: {str(e)}"
-                    )
-
-
-async def persist_city_feature(project_id: UUID, map_id: UUID, feature: dict[str, Any]):
-    async with AsyncSessionLocal() as db:
-        try:
-            await insert_feature_in_db(
-                db=db,
-                map_id=map_id,
-                data=feature,
-                project_id=project_id,
+    # Rows store one feature each, wrapped in a FeatureCollection: reuse
+    # collections that already have that shape instead of rewrapping them
+    feature_rows = []
+    for feature_collection in normalized_features:
+        features = feature_collection.get("features", [])
+        if len(features) == 1:
+            feature_rows.append(feature_collection)
+        else:
+            feature_rows.extend(
+                {"type": "FeatureCollection", "features": [feature]}
+                for feature in features
             )
-        except Exception as e:
-            logger.error(f"Failed to persist city feature for map {map_id}: {str(e)}")
+    try:
+        await insert_features_bulk(
+            db=db,
+            map_id=map_id,
+            data=feature_rows,
+            project_id=project_id,
+        )
+    except Exception as e:
+        logger.warning(
+            "Bulk insert failed for map %s, retrying row by row: %s", map_id, e
+        )
+        for feature_data in feature_rows:
+            try:
+                await insert_feature_in_db(
+                    db=db,
+                    map_id=map_id,
+                    data=feature_data,
+                    project_id=project_id,
+                )
+            except Exception as e:
+                logger.error(
+                    "Failed to persist individual feature for map %s: %s", map_id, e
+                )
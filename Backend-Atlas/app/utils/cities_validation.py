@@ -15,9 +15,14 @@ Usage:
 """
 from __future__ import annotations
 
+import os
+import pickle
 import re
+import tempfile
 import unicodedata
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from operator import itemgetter
+from typing import Iterable, List, Dict, Any, Optional, Tuple
 
 import geonamescache
 
@@ -26,37 +31,178 @@ _WORD_RE = re.compile(r"\b[\w\-']+\b", flags=re.UNICODE)
 
 
 def _normalize(s: str) -> str:
+    if s.isascii():
+        # NFKD leaves ASCII unchanged and it has no combining marks.
+        return s.casefold().strip()
     s = unicodedata.normalize("NFKD", s)
     s = "".join(c for c in s if not unicodedata.combining(c))
     return s.casefold().strip()
 
 
-# Load geonamescache cities into a mapping: normalized name -> list of candidate dicts
-_gc = geonamescache.GeonamesCache()
-_city_map: Dict[str, List[Dict[str, Any]]] = {}
-for info in _gc.get_cities().values():
-    name = info.get("name") or ""
-    country = info.get("countrycode") or ""
+# OCR text repeats the same tokens heavily, so token lookups go through a
+# memoized copy; gazetteer keys are built once and use `_normalize` directly.
+_normalize_token = lru_cache(maxsize=65536)(_normalize)
+
+
+def _parse_population(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+# Bump when the shape of the candidate dicts changes so stale snapshots are ignored.
+_CITY_MAP_FORMAT = 1
+CITY_MAP_CACHE_PATH = os.getenv(
+    "ATLAS_CITY_MAP_CACHE",
+    os.path.join(
+        tempfile.gettempdir(),
+        f"atlas_citymap_{geonamescache.__version__}_v{_CITY_MAP_FORMAT}.pkl",
+    ),
+)
+
+
+def _build_city_map() -> Dict[str, List[Dict[str, Any]]]:
+    city_map: Dict[str, List[Dict[str, Any]]] = {}
+    for info in _gc.get_cities().values():
+        name = info.get("name") or ""
+        country = info.get("countrycode") or ""
+        try:
+            lat = float(info.get("latitude"))
+            lon = float(info.get("longitude"))
+        except Exception:
+            continue
+        key = _normalize(name)
+        city_map.setdefault(key, []).append({
+            "name": name,
+            "lat": lat,
+            "lon": lon,
+            "country": country,
+            "population": info.get("population"),
+            "population_int": _parse_population(info.get("population")),
+        })
+    return city_map
+
+
+def _load_city_map(cache_path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Load the gazetteer snapshot from `cache_path`, building and saving it if needed.
+
+    Only snapshots owned by the current user are trusted, and the file is
+    written atomically so concurrent workers never read a partial snapshot.
+    """
     try:
-        lat = float(info.get("latitude"))
-        lon = float(info.get("longitude"))
+        if not hasattr(os, "getuid") or os.stat(cache_path).st_uid == os.getuid():
+            with open(cache_path, "rb") as f:
+                return pickle.load(f)
     except Exception:
-        continue
-    key = _normalize(name)
-    _city_map.setdefault(key, []).append({
-        "name": name,
-        "lat": lat,
-        "lon": lon,
-        "country": country,
-        "population": info.get("population"),
-    })
+        pass
+
+    city_map = _build_city_map()
+    try:
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump(city_map, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass
+    return city_map
+
+
+# Load geonamescache cities into a mapping: normalized name -> list of candidate dicts
+_gc = geonamescache.GeonamesCache()
+_city_map: Dict[str, List[Dict[str, Any]]] = _load_city_map(CITY_MAP_CACHE_PATH)
+
+_POPULATION = itemgetter("population_int")
+
+# Word-level trie over the same keys: each node maps a normalized token to its
+# child node, and nodes that complete a city name hold its candidates.
+_CANDIDATES = "__cands__"
+_city_trie: Dict[str, Any] = {}
+for key, candidates in _city_map.items():
+    node = _city_trie
+    for part in key.split(" "):
+        node = node.setdefault(part, {})
+    node[_CANDIDATES] = candidates
+
+
+def _longest_trie_match(norm_tokens: List[str], start: int, max_ngram: int):
+    """Return (n, candidates) for the longest city name starting at ``start``."""
+    node = _city_trie
+    best_n, best = 0, None
+    for n, tok in enumerate(norm_tokens[start : start + max_ngram], start=1):
+        node = node.get(tok)
+        if node is None:
+            break
+        if _CANDIDATES in node:
+            best_n, best = n, node[_CANDIDATES]
+    return best_n, best
+
+
+# Trigrams shared by more records than this are too generic to narrow a search
+# and are left out of the index.
+_TRIGRAM_MAX_POSTINGS = 5000
+
+
+@lru_cache(maxsize=1)
+def _alternate_name_index() -> Tuple[
+    List[Dict[str, Any]], List[str], Dict[str, List[int]], frozenset
+]:
+    """Build a trigram index over casefolded alternate names, on first use.
+
+    Each record's names are joined with NUL, which never occurs in a query, so
+    a substring test on the joined string matches exactly when one name does.
+    Trigrams too generic to be indexed are returned in a separate set, so that
+    a trigram in neither is known not to occur in any name.
+    """
+    records = list(_gc.get_cities().values())
+    haystacks = ["\0".join(v.casefold() for v in r.get("alternatenames") or ()) for r in records]
+    index: Dict[str, List[int]] = {}
+    for rec_id, hay in enumerate(haystacks):
+        for tg in {hay[j : j + 3] for j in range(len(hay) - 2)}:
+            index.setdefault(tg, []).append(rec_id)
+    generic = frozenset(tg for tg, ids in index.items() if len(ids) > _TRIGRAM_MAX_POSTINGS)
+    for tg in generic:
+        del index[tg]
+    return records, haystacks, index, generic
+
+
+def _search_cities(query: str) -> List[Dict[str, Any]]:
+    """Same results as `_gc.search_cities(query, contains_search=True)`, via the trigram index."""
+    records, haystacks, index, generic = _alternate_name_index()
+    query = query.casefold()
+    postings = []
+    for j in range(len(query) - 2):
+        tg = query[j : j + 3]
+        if tg in generic:
+            continue
+        ids = index.get(tg)
+        if ids is None:
+            # No name contains this trigram, so none can contain the query.
+            return []
+        postings.append(ids)
+    if postings:
+        rec_ids: Iterable[int] = sorted(set(min(postings, key=len)).intersection(*postings))
+    else:
+        # Query too short or only generic trigrams: scan everything.
+        rec_ids = range(len(records))
+    return [records[k] for k in rec_ids if query in haystacks[k]]
+
 
 def detect_cities_from_text(
-    text: str, max_ngram: int = 4, use_search: bool = False, search_limit: int = 10
+    text: str,
+    max_ngram: int = 4,
+    use_search: bool = False,
+    search_limit: int = 10,
+    stop_on_first: bool = False,
 ) -> List[Dict[str, Any]]:
     """Scan text for city names using the local gazetteer.
 
     Returns a list of matches with the matched text span (as tokens), and local candidates.
+    With `stop_on_first`, scanning stops after the first match.
 
     Each match: {
         'text': original_phrase,
@@ -69,11 +215,35 @@ def detect_cities_from_text(
     matches: List[Dict[str, Any]] = []
     i = 0
     length = len(tokens)
+    # Normalized once per token; phrase keys are joined from these
+    norm_tokens = [_normalize_token(tok) for tok in tokens]
+
+    if not use_search:
+        # Exact matches only: walk the trie once per position instead of
+        # joining every n-gram
+        while i < length:
+            n, candidates = _longest_trie_match(norm_tokens, i, max_ngram)
+            if candidates:
+                matches.append(
+                    {
+                        "text": " ".join(tokens[i : i + n]),
+                        "start_token": i,
+                        "end_token": i + n - 1,
+                        "candidates": candidates,
+                    }
+                )
+                if stop_on_first:
+                    return matches
+                i += n
+            else:
+                i += 1
+        return matches
+
     while i < length:
         found = False
         for n in range(min(max_ngram, length - i), 0, -1):
             phrase = " ".join(tokens[i : i + n])
-            key = _normalize(phrase)
+            key = " ".join(norm_tokens[i : i + n])
             candidates: List[Dict[str, Any]] = []
 
             # Exact lookup in prebuilt map (fast)
@@ -83,7 +253,7 @@ def detect_cities_from_text(
             # Optionally use geonamescache.search_cities for contains/fuzzy matching
             elif use_search:
                 try:
-                    raw = _gc.search_cities(phrase, case_sensitive=False, contains_search=True)
+                    raw = _search_cities(phrase)
                 except Exception:
                     raw = None
 
@@ -103,6 +273,7 @@ def detect_cities_from_text(
                             "lon": lon,
                             "country": country,
                             "population": info.get("population"),
+                            "population_int": _parse_population(info.get("population")),
                         })
                     # optionally trim to search_limit
                     if search_limit and len(candidates) > search_limit:
@@ -117,6 +288,8 @@ def detect_cities_from_text(
                         "candidates": candidates,
                     }
                 )
+                if stop_on_first:
+                    return matches
                 i += n
                 found = True
                 break
@@ -124,7 +297,7 @@ def detect_cities_from_text(
             i += 1
     return matches
 
-_all_ = ["detect_cities_from_text", "_city_map", "find_first_city"]
+_all_ = ["detect_cities_from_text", "_city_map", "find_first_city", "find_cities_batch"]
 
 
 def find_first_city(text: str) -> Dict[str, Any]:
@@ -138,11 +311,18 @@ def find_first_city(text: str) -> Dict[str, Any]:
 
     This makes it easier for callers to persist a record even when no
     local match is available (we can store coordinates as 0,0 in that case).
+
+    Lookups are memoized; each call returns a fresh copy of the cached result.
     """
+    return dict(_find_first_city_cached(text))
+
+
+@lru_cache(maxsize=100_000)
+def _find_first_city_cached(text: str) -> Dict[str, Any]:
     result: Dict[str, Any] = {"found": False, "query": text, "name": text, "lat": 0.0, "lon": 0.0, "matched_text": None}
 
     try:
-        matches = detect_cities_from_text(text)
+        matches = detect_cities_from_text(text, stop_on_first=True)
     except Exception:
         # On error, return non-found with query preserved
         return result
@@ -156,13 +336,7 @@ def find_first_city(text: str) -> Dict[str, Any]:
             continue
 
         # pick candidate with largest population when available
-        def pop_key(c):
-            try:
-                return int(c.get("population") or 0)
-            except Exception:
-                return 0
-
-        best = max(candidates, key=pop_key)
+        best = max(candidates, key=_POPULATION)
         result.update({
             "found": True,
             "name": best.get("name"),
@@ -172,4 +346,30 @@ def find_first_city(text: str) -> Dict[str, Any]:
         })
         return result
 
-    return result
\ No newline at end of file
+    return result
+
+
+def find_cities_batch(tokens: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Resolve many single-word tokens against the gazetteer in one pass.
+
+    Returns a mapping of each distinct token to a result shaped like
+    `find_first_city`'s. Tokens are looked up directly in `_city_map`,
+    which is what `find_first_city` amounts to for a single word.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+    for tok in tokens:
+        if tok in results:
+            continue
+        result: Dict[str, Any] = {"found": False, "query": tok, "name": tok, "lat": 0.0, "lon": 0.0, "matched_text": None}
+        candidates = _city_map.get(_normalize_token(tok))
+        if candidates:
+            best = max(candidates, key=_POPULATION)
+            result.update({
+                "found": True,
+                "name": best.get("name"),
+                "lat": best.get("lat"),
+                "lon": best.get("lon"),
+                "matched_text": tok,
+            })
+        results[tok] = result
+    return results
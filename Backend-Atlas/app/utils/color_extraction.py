@@ -1,6 +1,5 @@
-import math
 import os
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
 
 import cv2
 import numpy as np
@@ -25,19 +24,34 @@ from . import preprocessing
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_OUTPUT_DIR = os.path.join(BASE_DIR, "..", "extracted_color")
 
+# CSS4 palette as parallel name / uint8 RGB tables for nearest-name lookups
+_CSS4_NAMES = list(mcolors.CSS4_COLORS)
+_CSS4_RGB = np.array(
+    [
+        [int(c * 255) for c in mcolors.to_rgb(hex_value)]
+        for hex_value in mcolors.CSS4_COLORS.values()
+    ],
+    dtype=np.int32,
+)
+
 
 def load_image_rgb_alpha_mask(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
 ) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
     """
     Load an image and return (rgb, alpha, opaque_mask).
 
+    image_path may also be an image already decoded with cv2.IMREAD_UNCHANGED.
+
     rgb: (H, W, 3)
     alpha: (H, W) or None
     opaque_mask: (H, W) bool
     """
 
-    img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
+    if isinstance(image_path, np.ndarray):
+        img = image_path
+    else:
+        img = cv2.imread(image_path, cv2.IMREAD_UNCHANGED)
 
     if img is None:
         raise ValueError(f"Image file not found: {image_path}")
@@ -223,17 +237,19 @@ def build_exclusive_masks_by_nearest_center(
         valid: (H, W) bool pixels that are within mask_deltaE of at least one center and opaque
     """
     # centers_lab: (K, 3)
-    # We compute ΔE for each center and stack into (H, W, K).
-    dists = []
+    # Keep a running minimum instead of stacking K full (H, W) distance maps.
+    # Strict "<" keeps the first center on ties, like argmin.
+    best_idx = np.zeros(lab.shape[:2], dtype=np.int32)
+    best_dE = None
     for k in range(centers_lab.shape[0]):
         center = centers_lab[k].reshape(1, 1, 3)
         dE_k = deltaE_ciede2000(lab, center)  # (H, W)
-        dists.append(dE_k)
-
-    dist_stack = np.stack(dists, axis=-1)  # (H, W, K)
-
-    best_idx = np.argmin(dist_stack, axis=-1).astype(np.int32)
-    best_dE = np.min(dist_stack, axis=-1)
+        if best_dE is None:
+            best_dE = dE_k
+            continue
+        closer = dE_k < best_dE
+        best_idx[closer] = k
+        np.minimum(best_dE, dE_k, out=best_dE)
 
     valid = (best_dE <= mask_deltaE) & opaque_mask
 
@@ -256,22 +272,8 @@ def get_nearest_css4_color_name(rgb_tuple: Tuple[int, int, int]) -> str:
     """
     Find the closest CSS4 color name for a given RGB tuple.
     """
-    min_distance = float("inf")
-    closest_name = "unknown"
-
-    for name, hex_value in mcolors.CSS4_COLORS.items():
-        r_c, g_c, b_c = mcolors.to_rgb(hex_value)
-        r_c, g_c, b_c = [int(x * 255) for x in (r_c, g_c, b_c)]
-        distance = math.sqrt(
-            (rgb_tuple[0] - r_c) ** 2
-            + (rgb_tuple[1] - g_c) ** 2
-            + (rgb_tuple[2] - b_c) ** 2
-        )
-        if distance < min_distance:
-            min_distance = distance
-            closest_name = name
-
-    return closest_name
+    diff = _CSS4_RGB - np.asarray(rgb_tuple, dtype=np.int32)
+    return _CSS4_NAMES[int(np.argmin((diff * diff).sum(axis=1)))]
 
 
 def save_mask_png(
@@ -406,6 +408,37 @@ def build_normalized_feature(
     }
 
 
+def _scale_legend_shapes(legend_shapes: List[Dict], factor: float) -> List[Dict]:
+    """Return copies of the legend shapes with pixel coordinates multiplied by factor."""
+
+    def scale_bbox(bb: Optional[Dict]) -> Optional[Dict]:
+        if not bb:
+            return bb
+        return {key: float(bb[key]) * factor for key in ("x", "y", "width", "height")}
+
+    scaled = []
+    for shape in legend_shapes:
+        pixel_coords = shape.get("geometry", {}).get("pixel_coords", {})
+        contour_points = pixel_coords.get("contour_points")
+        scaled.append(
+            {
+                "bounding_box": scale_bbox(shape.get("bounding_box")),
+                "geometry": {
+                    "pixel_coords": {
+                        "contour_points": [
+                            [int(round(x * factor)), int(round(y * factor))]
+                            for x, y in contour_points
+                        ]
+                        if contour_points
+                        else contour_points,
+                        "bounding_box": scale_bbox(pixel_coords.get("bounding_box")),
+                    }
+                },
+            }
+        )
+    return scaled
+
+
 def _sanitize_name(name: str, max_length: int = 64) -> str:
     """Strip whitespace, replace filesystem-unsafe characters, and enforce a max length."""
     name = name.strip()
@@ -416,7 +449,7 @@ def _sanitize_name(name: str, max_length: int = 64) -> str:
 
 
 def extract_colors(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     output_dir: str = DEFAULT_OUTPUT_DIR,
     debug: bool = False,
     legend_shapes: Optional[List[Dict]] = None,
@@ -437,6 +470,7 @@ def extract_colors(
     closing_radius: int = 3,  # Dilation then erosion to fill small gaps
     simplify_tolerance: float = 0.5,
     sampling_radius: int = 20,  # Neighbourhood radius (px) used when sampling imposed click positions
+    max_working_side: Optional[int] = None,  # Downscale larger images to this long side before analysis
 ) -> Dict:
     """
     Extract exclusive color layers using:
@@ -447,10 +481,17 @@ def extract_colors(
       - pixel_features (GeoJSON FeatureCollections with pixel-space geometries)
       - normalized_features (GeoJSON FeatureCollections)
       - masks (paths to debug PNGs of each mask, if debug=True) *For futurs tests*
+
+    When max_working_side is set, the analysis runs on a downscaled copy and
+    the pixel-space geometries are scaled back to the original resolution.
     """
 
     # 0) Prepare output directory
-    base_name = os.path.splitext(os.path.basename(image_path))[0]
+    base_name = (
+        os.path.splitext(os.path.basename(image_path))[0]
+        if isinstance(image_path, str)
+        else "image"
+    )
     image_output_dir = os.path.join(output_dir, base_name)
 
     if debug:
@@ -458,6 +499,25 @@ def extract_colors(
 
     # 1) Load raw image and alpha mask
     rgb_u8, alpha, opaque_mask = load_image_rgb_alpha_mask(image_path)
+
+    # Work on a downscaled copy: layer colours are unchanged while the
+    # per-pixel ΔE and morphology cost drops with the pixel count.
+    work_scale = 1.0
+    if max_working_side and max(rgb_u8.shape[:2]) > max_working_side:
+        work_scale = max_working_side / max(rgb_u8.shape[:2])
+        height, width = rgb_u8.shape[:2]
+        work_size = (max(1, round(width * work_scale)), max(1, round(height * work_scale)))
+        rgb_u8 = cv2.resize(rgb_u8, work_size, interpolation=cv2.INTER_AREA)
+        opaque_mask = cv2.resize(
+            opaque_mask.astype(np.uint8), work_size, interpolation=cv2.INTER_NEAREST
+        ).astype(bool)
+        if alpha is not None:
+            alpha = cv2.resize(alpha, work_size, interpolation=cv2.INTER_NEAREST)
+        if legend_shapes:
+            legend_shapes = _scale_legend_shapes(legend_shapes, work_scale)
+        opening_radius = max(1, round(opening_radius * work_scale)) if opening_radius > 0 else 0
+        closing_radius = max(1, round(closing_radius * work_scale)) if closing_radius > 0 else 0
+
     original_rgb = img_as_float(rgb_u8)
 
     # 2) Preprocess full image for color extraction (keeps/updates mask)
@@ -491,6 +551,7 @@ def extract_colors(
                 except (TypeError, ValueError):
                     radius_px = sampling_radius
             radius_px = max(1, min(200, radius_px))
+            radius_px = max(1, round(radius_px * work_scale))
 
             result = sample_color_at(rgb, nx, ny, radius_px=radius_px)
             if result is not None:
@@ -531,18 +592,21 @@ def extract_colors(
     )
 
     # 7) Build per-color masks and features
+    # Structuring elements only depend on the radii: build them once for all colours
+    opening_footprint = disk(opening_radius) if opening_radius > 0 else None
+    closing_footprint = disk(closing_radius) if closing_radius > 0 else None
     seen_names: Dict[str, int] = {}
     color_index = 1
     for k, entry in enumerate(dominants):
         mask = (best_idx == k) & valid
 
         # 1. Opening: Remove small noise/speckles
-        if opening_radius > 0:
-            mask = opening(mask, disk(opening_radius))
+        if opening_footprint is not None:
+            mask = opening(mask, opening_footprint)
 
         # 2. Closing: Bridge small gaps (useful for connecting fragmented regions)
-        if closing_radius > 0:
-            mask = closing(mask, disk(closing_radius))
+        if closing_footprint is not None:
+            mask = closing(mask, closing_footprint)
 
         # 3. Fill holes: Remove interior holes (text, small waters, etc.)
         mask = binary_fill_holes(mask)
@@ -578,6 +642,13 @@ def extract_colors(
 
         geometry = mask_to_geometry(mask)
         if geometry:
+            if work_scale != 1.0:
+                geometry = affinity.scale(
+                    geometry,
+                    xfact=1.0 / work_scale,
+                    yfact=1.0 / work_scale,
+                    origin=(0.0, 0.0),
+                )
             geometry = simplify_geometry(geometry, simplify_tolerance)
 
             # build_features expects a list of polygons, so wrap the geometry in a list
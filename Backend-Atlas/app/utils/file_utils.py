@@ -1,5 +1,8 @@
 import os
 
+import cv2
+import numpy as np
+
 
 def validate_file_extension(file_path: str) -> bool:
     supported_file_ext = (
@@ -10,3 +13,44 @@ def validate_file_extension(file_path: str) -> bool:
     )
     ext = os.path.splitext(file_path)[1].lower()
     return ext in supported_file_ext
+
+
+# Leading bytes of the formats accepted by validate_file_extension
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_JPEG_SIGNATURE = b"\xff\xd8\xff"
+_IMAGE_SIGNATURES = (_PNG_SIGNATURE, _JPEG_SIGNATURE)
+
+
+def has_image_signature(file_content: bytes) -> bool:
+    """Check the leading magic bytes of an upload for a PNG or JPEG image."""
+    return file_content.startswith(_IMAGE_SIGNATURES)
+
+
+def write_text_file(path: str, text: str) -> None:
+    """Encode text once and write it to path with raw os.write calls."""
+    payload = memoryview(text.encode("utf-8"))
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        while payload:
+            written = os.write(fd, payload)
+            payload = payload[written:]
+    finally:
+        os.close(fd)
+
+
+def encode_grayscale_png(file_content: bytes) -> bytes | None:
+    """Re-encode an uploaded image as a grayscale PNG.
+
+    Returns None when the bytes cannot be decoded or the result would not be
+    smaller than the original upload. JPEG uploads are returned as None without
+    decoding them, a lossless grayscale PNG almost never beats a JPEG.
+    """
+    if file_content.startswith(_JPEG_SIGNATURE):
+        return None
+    image = cv2.imdecode(np.frombuffer(file_content, np.uint8), cv2.IMREAD_GRAYSCALE)
+    if image is None:
+        return None
+    ok, encoded = cv2.imencode(".png", image)
+    if not ok or encoded.nbytes >= len(file_content):
+        return None
+    return encoded.tobytes()
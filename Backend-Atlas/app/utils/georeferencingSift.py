@@ -6,9 +6,11 @@ from typing import Dict, List, Optional, Tuple
 import logging
 
 import numpy as np
-from shapely.geometry import shape, mapping, Point, Polygon, MultiPolygon
-from shapely.ops import transform, unary_union, nearest_points
+import shapely
+from shapely.geometry import shape, mapping, LineString, Polygon, MultiPolygon
+from shapely.ops import transform, unary_union
 from shapely.geometry.base import BaseGeometry
+from shapely.strtree import STRtree
 
 from app.utils.coastline_land_mask import (
     clip_zone_to_land_mask,
@@ -27,6 +29,12 @@ JSONDict = Dict[str, object]
 R_EARTH = 6378137.0
 DEBUG = False
 
+# Coastline lines are cut into pieces of at most this many vertices before
+# indexing, so nearest queries only measure against a few short pieces.
+COASTLINE_INDEX_PIECE_VERTICES = 64
+
+CoastlineIndex = Tuple[STRtree, np.ndarray]
+
 
 @lru_cache(maxsize=8)
 def _load_coastline_geometry_cached(
@@ -57,53 +65,128 @@ def _load_coastline_geometry_cached(
         return unary_union(line_geometries)
 
     except Exception as e:
-        logger.error(f"Failed to load coastline geometry: {e}", exc_info=True)
+        logger.error("Failed to load coastline geometry: %s", e, exc_info=True)
         return None
 
 
-def _load_coastline_geometry(
-    coastline_file: str = "ne_coastline.geojson",
-)-> Optional[BaseGeometry]:
-    """Load coastline linework as a single geometry for snapping."""
+def _coastline_cache_key(coastline_file: str) -> Optional[Tuple[str, float]]:
+    """Return (path, mtime) for a coastline file, or None if it is unusable."""
     coastline_path = os.path.join(GEOJSON_DIR, coastline_file)
 
     if not os.path.exists(coastline_path):
-        logger.warning(f"Coastline file not found: {coastline_path}")
+        logger.warning("Coastline file not found: %s", coastline_path)
         return None
 
     try:
         mtime = os.path.getmtime(coastline_path)
     except OSError as e:
-        logger.warning(f"Cannot stat coastline file '{coastline_path}': {e}")
+        logger.warning("Cannot stat coastline file '%s': %s", coastline_path, e)
         return None
 
-    return _load_coastline_geometry_cached(coastline_path, float(mtime))
+    return coastline_path, float(mtime)
+
+
+def _load_coastline_geometry(
+    coastline_file: str = "ne_coastline.geojson",
+)-> Optional[BaseGeometry]:
+    """Load coastline linework as a single geometry for snapping."""
+    cache_key = _coastline_cache_key(coastline_file)
+    if cache_key is None:
+        return None
+    return _load_coastline_geometry_cached(*cache_key)
+
+
+@lru_cache(maxsize=8)
+def _load_coastline_index_3857_cached(
+    coastline_path: str,
+    mtime: float,
+) -> Optional[CoastlineIndex]:
+    """Project the coastline to WebMercator and index it; cache by path + mtime."""
+    coastline_geom_wgs84 = _load_coastline_geometry_cached(coastline_path, mtime)
+    if coastline_geom_wgs84 is None:
+        return None
+    coastline_geom_3857 = transform(_lonlat_arrays_to_webmercator, coastline_geom_wgs84)
+    return _build_coastline_index(coastline_geom_3857)
+
+
+def _load_coastline_index_3857(
+    coastline_file: str = "ne_coastline.geojson",
+) -> Optional[CoastlineIndex]:
+    """Coastline snapping index in WebMercator, built once per worker process."""
+    cache_key = _coastline_cache_key(coastline_file)
+    if cache_key is None:
+        return None
+    return _load_coastline_index_3857_cached(*cache_key)
+
+
+# Last land mask seen and its WebMercator projection. The loader caches the
+# mask object, so an identity check is enough to reuse the projection.
+_land_mask_3857_cache: Tuple[Optional[BaseGeometry], Optional[BaseGeometry]] = (None, None)
+
+
+def _project_land_mask(land_mask_wgs84: BaseGeometry) -> BaseGeometry:
+    """Project the land mask to WebMercator once per loaded mask."""
+    global _land_mask_3857_cache
+    if _land_mask_3857_cache[0] is not land_mask_wgs84:
+        _land_mask_3857_cache = (
+            land_mask_wgs84,
+            transform(_lonlat_arrays_to_webmercator, land_mask_wgs84),
+        )
+    return _land_mask_3857_cache[1]
+
+
+def _build_coastline_index(coastline_geom: BaseGeometry) -> CoastlineIndex:
+    """Cut coastline linework into short pieces and index them in an STRtree.
+
+    The distance to the nearest piece equals the distance to the whole
+    coastline, without scanning every segment for each query point.
+    """
+    lines = getattr(coastline_geom, "geoms", [coastline_geom])
+    step = COASTLINE_INDEX_PIECE_VERTICES - 1
+    pieces: List[LineString] = []
+    for line in lines:
+        coords = np.asarray(line.coords)
+        for start in range(0, max(len(coords) - 1, 1), step):
+            pieces.append(LineString(coords[start : start + step + 1]))
+
+    piece_array = np.empty(len(pieces), dtype=object)
+    piece_array[:] = pieces
+    return STRtree(piece_array), piece_array
 
 
 def _snap_ring_coords_to_coastline(
     coords: List[Tuple[float, float]],
-    coastline_geom,
+    coastline_index: CoastlineIndex,
     snap_tolerance: float,
 ) -> Tuple[List[Tuple[float, float]], int, int]:
     """Snap ring coordinates to coastline where points are within tolerance."""
     if not coords:
         return coords, 0, 0
 
-    snapped_coords: List[Tuple[float, float]] = []
-    total_points = 0
-    snapped_points = 0
-
-    for x, y in coords:
-        total_points += 1
-        p = Point(float(x), float(y))
-        distance = p.distance(coastline_geom)
+    tree, pieces = coastline_index
+    coords_array = np.asarray(coords, dtype=float)[:, :2]
+    points = shapely.points(coords_array)
+
+    # One batched index query finds the nearest piece for every vertex
+    # within tolerance; the others are left where they are.
+    point_idx, piece_idx = tree.query_nearest(
+        points, max_distance=snap_tolerance, all_matches=False
+    )
+
+    snapped_array = coords_array.copy()
+    if len(point_idx):
+        # shortest_line runs from each vertex to its closest point on the
+        # matched piece, so its end point is the snapped position.
+        lines = shapely.shortest_line(points[point_idx], pieces[piece_idx])
+        snapped_array[point_idx] = shapely.get_coordinates(
+            shapely.get_point(lines, 1)
+        )
 
-        if distance <= snap_tolerance:
-            _, nearest_on_coast = nearest_points(p, coastline_geom)
-            snapped_coords.append((float(nearest_on_coast.x), float(nearest_on_coast.y)))
-            snapped_points += 1
-        else:
-            snapped_coords.append((float(x), float(y)))
+    snapped_coords: List[Tuple[float, float]] = [
+        (float(x), float(y)) for x, y in snapped_array
+    ]
+    total_points = len(coords)
+    snapped_points = len(point_idx)
 
     # Ensure ring closure remains valid
     if snapped_coords and snapped_coords[0] != snapped_coords[-1]:
@@ -114,14 +197,14 @@ def _snap_ring_coords_to_coastline(
 
 def _snap_geometry_to_coastline(
     geom: Optional[BaseGeometry],
-    coastline_geom: Optional[BaseGeometry],
+    coastline_index: Optional[CoastlineIndex],
     snap_tolerance: float,
 ) -> Tuple[Optional[BaseGeometry], int, int]:
     """Snap polygon boundary vertices to coastline and preserve valid geometry."""
     total_points = 0
     snapped_points = 0
 
-    if coastline_geom is None or geom is None or geom.is_empty:
+    if coastline_index is None or geom is None or geom.is_empty:
         return geom, total_points, snapped_points
 
     def _collect_polygons(candidate_geom: Optional[BaseGeometry]) -> List[Polygon]:
@@ -145,7 +228,7 @@ def _snap_geometry_to_coastline(
 
         ext_coords = list(poly.exterior.coords)
         snapped_ext, t_ext, s_ext = _snap_ring_coords_to_coastline(
-            ext_coords, coastline_geom, snap_tolerance
+            ext_coords, coastline_index, snap_tolerance
         )
         poly_total += t_ext
         poly_snapped += s_ext
@@ -154,7 +237,7 @@ def _snap_geometry_to_coastline(
         for interior in poly.interiors:
             int_coords = list(interior.coords)
             snapped_int, t_int, s_int = _snap_ring_coords_to_coastline(
-                int_coords, coastline_geom, snap_tolerance
+                int_coords, coastline_index, snap_tolerance
             )
             poly_total += t_int
             poly_snapped += s_int
@@ -201,12 +284,6 @@ def _lonlat_to_webmercator(lon: float, lat: float) -> XY:
     return x, y
 
 
-def _webmercator_to_lonlat(x: float, y: float) -> LonLat:
-    lon = math.degrees(x / R_EARTH)
-    lat = math.degrees(2.0 * math.atan(math.exp(y / R_EARTH)) - math.pi / 2.0)
-    return lon, lat
-
-
 def _lonlat_arrays_to_webmercator(x, y, z=None):
     """Vectorized transform callback for Shapely: lon/lat (EPSG:4326) -> EPSG:3857."""
     x_arr = np.asarray(x, dtype=float)
@@ -221,6 +298,19 @@ def _lonlat_arrays_to_webmercator(x, y, z=None):
     return X, Y, z
 
 
+def _webmercator_arrays_to_lonlat(x, y, z=None):
+    """Vectorized transform callback for Shapely: EPSG:3857 -> lon/lat (EPSG:4326)."""
+    x_arr = np.asarray(x, dtype=float)
+    y_arr = np.asarray(y, dtype=float)
+
+    lon = np.degrees(x_arr / R_EARTH)
+    lat = np.degrees(2.0 * np.arctan(np.exp(y_arr / R_EARTH)) - np.pi / 2.0)
+
+    if z is None:
+        return lon, lat
+    return lon, lat, z
+
+
 def _estimate_affine_meters_per_pixel(affine: "AffineTransformation") -> float:
     """Estimate average meters-per-pixel from affine linear terms."""
     a = float(affine.matrix[0, 0])
@@ -406,7 +496,7 @@ def georeference_features_with_sift_points(
         
         # Build affine transformation: pixel -> WebMercator
         affine = AffineTransformation(src, dst)
-        coastline_geom_3857 = None
+        coastline_index_3857 = None
         land_mask_3857 = None
         meters_per_pixel = None
         diagonal_px = None
@@ -414,19 +504,14 @@ def georeference_features_with_sift_points(
         snap_tolerance_m = None
 
         if snap_to_coastline:
-            coastline_geom_wgs84 = _load_coastline_geometry()
-            if coastline_geom_wgs84 is not None:
-                coastline_geom_3857 = transform(
-                    _lonlat_arrays_to_webmercator,
-                    coastline_geom_wgs84,
-                )
+            coastline_index_3857 = _load_coastline_index_3857()
 
-        snapping_enabled = snap_to_coastline and coastline_geom_3857 is not None
+        snapping_enabled = snap_to_coastline and coastline_index_3857 is not None
 
         if clip_to_land_mask:
             land_mask_wgs84 = load_land_mask_from_coastline_and_ocean_points()
             if land_mask_wgs84 is not None:
-                land_mask_3857 = transform(_lonlat_arrays_to_webmercator, land_mask_wgs84)
+                land_mask_3857 = _project_land_mask(land_mask_wgs84)
             else:
                 logger.warning("Land/ocean mask unavailable; ocean clipping will be skipped.")
 
@@ -464,20 +549,6 @@ def georeference_features_with_sift_points(
                 return X, Y
             return X, Y, z
 
-        def _to_lonlat(x, y, z=None):
-            """Convert WebMercator -> lon/lat"""
-            x_arr = np.asarray(x, dtype=float)
-            y_arr = np.asarray(y, dtype=float)
-            lons = np.empty_like(x_arr)
-            lats = np.empty_like(y_arr)
-            for i in range(x_arr.size):
-                lon, lat = _webmercator_to_lonlat(float(x_arr.flat[i]), float(y_arr.flat[i]))
-                lons.flat[i] = lon
-                lats.flat[i] = lat
-            if z is None:
-                return lons, lats
-            return lons, lats, z
-
         georef_collections: List[JSONDict] = []
 
         for _, fc in enumerate(pixel_feature_collections):
@@ -490,7 +561,7 @@ def georeference_features_with_sift_points(
                 try:
                     geom = shape(feat.get("geometry"))
                 except Exception as e:
-                    logger.warning(f"Failed to parse geometry at feature {feat_idx}: {e}")
+                    logger.warning("Failed to parse geometry at feature %s: %s", feat_idx, e)
                     continue
 
                 props = dict(feat.get("properties", {}))
@@ -499,13 +570,13 @@ def georeference_features_with_sift_points(
                     # Transform: pixel -> WebMercator
                     geom_3857 = transform(_to_3857, geom)
                 except Exception as e:
-                    logger.error(f"Failed to transform feature {feat_idx}: {e}", exc_info=True)
+                    logger.error("Failed to transform feature %s: %s", feat_idx, e, exc_info=True)
                     continue
 
                 if snapping_enabled:
                     geom_3857, total_pts, snapped_pts = _snap_geometry_to_coastline(
                         geom_3857,
-                        coastline_geom_3857,
+                        coastline_index_3857,
                         snap_tolerance_m,
                     )
                     total_boundary_points += total_pts
@@ -524,10 +595,12 @@ def georeference_features_with_sift_points(
 
                 try:
                     # Convert WebMercator -> WGS84 (after optional snapping)
-                    geom_wgs84 = transform(_to_lonlat, geom_3857)
+                    geom_wgs84 = transform(_webmercator_arrays_to_lonlat, geom_3857)
                 except Exception as e:
                     logger.error(
-                        f"Failed to convert transformed geometry to lon/lat at feature {feat_idx}: {e}",
+                        "Failed to convert transformed geometry to lon/lat at feature %s: %s",
+                        feat_idx,
+                        e,
                         exc_info=True,
                     )
                     continue
@@ -558,5 +631,5 @@ def georeference_features_with_sift_points(
         return georef_collections
         
     except Exception as e:
-        logger.error(f"Error in georeference_features_with_sift_points: {str(e)}", exc_info=True)
+        logger.error("Error in georeference_features_with_sift_points: %s", e, exc_info=True)
         raise
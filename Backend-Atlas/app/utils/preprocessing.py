@@ -5,12 +5,18 @@ from typing import Tuple, Optional
 def read_image(image_path) -> np.ndarray:
     """
     Upscales the image using Lanczos-4 interpolation to preserve text sharpness.
-    :param image_path: Path to the image
+    :param image_path: Path to the image, or an already decoded OpenCV (BGR/BGRA/grey) array
     :return: 3 channels RGB formatted numpy array of the image. Values are floats [0.0, 1.0]
     :raises: IOError
     """
-    # skimage.io.imread returns an image with channels in RGB order by default
-    img = skimage.io.imread(image_path)
+    if isinstance(image_path, np.ndarray):
+        img = image_path
+        if img.ndim == 3 and img.shape[2] >= 3:
+            # OpenCV decodes to BGR(A), flip the colour channels to RGB(A)
+            img = img[:, :, [2, 1, 0, *range(3, img.shape[2])]]
+    else:
+        # skimage.io.imread returns an image with channels in RGB order by default
+        img = skimage.io.imread(image_path)
     if img is None:
         raise IOError(f"Could not read image for given path: {image_path}")
 
@@ -2,10 +2,11 @@ import json
 import logging
 import os
 from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
  
 import cv2
 import numpy as np
+import skimage
 from shapely import affinity
 from shapely.geometry import Polygon
  
@@ -106,8 +107,11 @@ def filter_text_overlapping_contours(
 def preprocess_image(gray: np.ndarray, threshold_value: int = 127) -> np.ndarray:
     """Binarise a grayscale image.  Uses a simple threshold for near-binary
     inputs and adaptive Gaussian thresholding otherwise."""
-    if len(np.unique(gray)) <= SIMPLE_BINARY_UNIQUE_LEVELS:
-        return (gray > threshold_value).astype(np.uint8) * 255
+    # Histogram count is O(n) on uint8, np.unique would sort every pixel
+    levels = np.count_nonzero(cv2.calcHist([gray], [0], None, [256], [0, 256]))
+    if levels <= SIMPLE_BINARY_UNIQUE_LEVELS:
+        _, binary = cv2.threshold(gray, threshold_value, 255, cv2.THRESH_BINARY)
+        return binary
 
     return cv2.adaptiveThreshold(
         gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY_INV, 31, 6
@@ -194,7 +198,7 @@ def extract_contour_properties(
         "geometry": {
             "type": "Polygon",
             "pixel_coords": {
-                "contour_points": [[int(pt[0][0]), int(pt[0][1])] for pt in approx],
+                "contour_points": approx.reshape(-1, 2).tolist(),
                 "bounding_box": bounding_box,
                 "center": {"x": int(cx), "y": int(cy)},
             },
@@ -423,7 +427,7 @@ def idealize_shape_points(
     if shape_type == "Rectangle":
         rect = cv2.minAreaRect(contour)
         box = cv2.boxPoints(rect)
-        return [[round(float(pt[0]), 3), round(float(pt[1]), 3)] for pt in box]
+        return np.round(box.astype(np.float64), 3).tolist()
         
     elif shape_type == "Circle":
         (x, y), radius = cv2.minEnclosingCircle(contour)
@@ -433,14 +437,9 @@ def idealize_shape_points(
         steps = int(np.ceil(perimeter / CIRCLE_TARGET_SEGMENT_LENGTH_PX))
         steps = int(np.clip(steps, CIRCLE_MIN_STEPS, CIRCLE_MAX_STEPS))
 
-        points: List[List[float]] = []
-        for i in range(steps):
-            angle = (i / steps) * 2.0 * np.pi
-            px = x + r * np.cos(angle)
-            py = y + r * np.sin(angle)
-            points.append([round(float(px), 3), round(float(py), 3)])
-
-        return points
+        angles = (np.arange(steps) / steps) * 2.0 * np.pi
+        points = np.column_stack((x + r * np.cos(angles), y + r * np.sin(angles)))
+        return np.round(points, 3).tolist()
         
     else:
         if approx is None:
@@ -450,7 +449,7 @@ def idealize_shape_points(
                 CONTOUR_APPROX_EPSILON_RATIO * perimeter,
                 True,
             )
-        return [[float(pt[0][0]), float(pt[0][1])] for pt in approx]
+        return approx.reshape(-1, 2).astype(np.float64).tolist()
 
 
 def _sync_shape_metrics_with_contour(
@@ -688,21 +687,48 @@ def export_shapes_to_normalized_geojson(
 # Pipeline helpers
 # ---------------------------------------------------------------------------
  
+# Same quantisation as the float pipeline (read_image, then * 255 truncated),
+# so decoded arrays and file paths produce identical shapes.
+_UINT8_ROUNDTRIP_LUT = (
+    skimage.util.img_as_float(np.arange(256, dtype=np.uint8)) * 255
+).astype(np.uint8)
+
+
+def _to_bgr_uint8(image: np.ndarray) -> np.ndarray:
+    """Bring a decoded uint8 image to 3-channel BGR, compositing alpha on white."""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif image.shape[2] == 4:
+        if not (image[:, :, 3] == 255).all():
+            # Translucent pixels need the float blend, like read_image
+            pixels = skimage.util.img_as_float(image)
+            alpha = pixels[:, :, 3:]
+            return ((pixels[:, :, :3] * alpha + (1 - alpha)) * 255).astype(np.uint8)
+        image = image[:, :, :3]
+    return cv2.LUT(image, _UINT8_ROUNDTRIP_LUT)
+
+
 def _preprocess_for_contours(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     threshold_value: int,
 ) -> Dict:
     """Load, denoise, enhance contrast on L channel, and binarise an image.
 
+    ``image_path`` may also be an image already decoded by ``cv2.imread``.
+
     Returns a dict with all intermediate images and dimensions.
     """
-    image = preprocessing.read_image(image_path)
-    if image is None:
-        raise ValueError(f"Unable to load image: {image_path}")
+    if isinstance(image_path, np.ndarray) and image_path.dtype == np.uint8:
+        # Already decoded: stay in uint8 BGR, no float RGB round-trip
+        image_bgr = _to_bgr_uint8(image_path)
+    else:
+        image = preprocessing.read_image(image_path)
+        if image is None:
+            raise ValueError("Unable to load image")
+        image_uint8 = (image * 255).astype(np.uint8)
+        image_bgr = cv2.cvtColor(image_uint8, cv2.COLOR_RGB2BGR)
 
-    height, width = image.shape[:2]
-    image_uint8 = (image * 255).astype(np.uint8)
-    image_bgr = cv2.cvtColor(image_uint8, cv2.COLOR_RGB2BGR)
+    height, width = image_bgr.shape[:2]
 
     image_denoised = cv2.bilateralFilter(image_bgr, d=11, sigmaColor=75, sigmaSpace=75)
 
@@ -840,7 +866,7 @@ def _write_debug_outputs(
 # ---------------------------------------------------------------------------
 
 def extract_shapes(
-    image_path: str,
+    image_path: Union[str, np.ndarray],
     output_dir: str = DEFAULT_OUTPUT_DIR,
     min_area: int = 50,
     max_area: int = 5000,
@@ -917,7 +943,11 @@ def extract_shapes(
     ]
  
     if debug:
-        base_name = os.path.splitext(os.path.basename(image_path))[0]
+        base_name = (
+            os.path.splitext(os.path.basename(image_path))[0]
+            if isinstance(image_path, str)
+            else "image"
+        )
         image_output_dir = os.path.join(output_dir, base_name)
         os.makedirs(image_output_dir, exist_ok=True)
  
@@ -926,7 +956,7 @@ def extract_shapes(
             image_bgr,
             binary_mask,
             shapes_with_contours,
-            image_path,
+            image_path if isinstance(image_path, str) else base_name,
             image_output_dir,
             width,
             height,
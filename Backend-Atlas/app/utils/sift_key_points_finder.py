@@ -6,6 +6,8 @@ import json
 NUMBER_OF_KEYPOINTS = 10
 BORDER_MARGIN = 20  # pixels from edge
 MIN_DISTANCE_BETWEEN_KEYPOINTS = 10  
+# Spacing is checked on squared distances, no square root per pair
+_MIN_DISTANCE_SQ = MIN_DISTANCE_BETWEEN_KEYPOINTS ** 2
 DEBUG = False
 
 def detect_sift_keypoints_on_image(gray_image: np.ndarray, apply_edge_detection: bool = True):
@@ -47,9 +49,7 @@ def detect_sift_keypoints_on_image(gray_image: np.ndarray, apply_edge_detection:
         for selected_kp in spaced_keypoints:
             dx = kp.pt[0] - selected_kp.pt[0]
             dy = kp.pt[1] - selected_kp.pt[1]
-            distance = (dx**2 + dy**2)**0.5
-            
-            if distance < MIN_DISTANCE_BETWEEN_KEYPOINTS:
+            if dx * dx + dy * dy < _MIN_DISTANCE_SQ:
                 too_close = True
                 break
         
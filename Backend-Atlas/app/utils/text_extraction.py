@@ -1,13 +1,118 @@
 import os
-import easyocr
 import cv2
-import copy
 import logging
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 logger = logging.getLogger(__name__)
 
-def extract_text(image: np.ndarray, languages: list[str], gpu_acc: bool = False) -> tuple[list, np.ndarray]:
+# On GPU, above this long side (of the source image), the image is OCR'd as a
+# grid of overlapping tiles read concurrently instead of in a single pass. On
+# CPU torch already spreads one inference over every core, and the overlap adds
+# pixels to read, so CPU readers always take a single pass.
+OCR_TILE_MIN_SIDE = 2000
+OCR_TILE_GRID = (4, 4)
+OCR_TILE_OVERLAP = 0.1
+# Labels up to this long (px, at OCR scale) crossing a seam are read whole by
+# one of the two tiles instead of being split between them.
+OCR_TILE_MIN_OVERLAP_PX = 320
+OCR_TILE_MAX_WORKERS = 4
+# Upper bound on the long side handed to the reader; scans above it are
+# downsampled instead of upscaled. Tunable per deployment with ATLAS_OCR_MAX_SIDE.
+OCR_MAX_SIDE = int(os.getenv("ATLAS_OCR_MAX_SIDE", "3500"))
+
+
+def split_into_tiles(
+    image: np.ndarray, rows: int, cols: int, overlap: float, min_pad: int = 0
+) -> list[tuple[np.ndarray, tuple[int, int], tuple[int, int, int, int]]]:
+    """
+    Split an image into a rows x cols grid of overlapping tiles.
+
+    :param image: Numpy image array.
+    :param rows: Number of tile rows.
+    :param cols: Number of tile columns.
+    :param overlap: Fraction of a tile size added on each side of the tile.
+    :param min_pad: Minimum number of pixels added on each side of the tile.
+    :return: List of (tile, (x_offset, y_offset), core_box) where core_box is the
+        (x0, y0, x1, y1) non-overlapping region owned by the tile, in image coordinates.
+    """
+    height, width = image.shape[:2]
+    tile_h = -(-height // rows)
+    tile_w = -(-width // cols)
+    pad_y = max(int(tile_h * overlap), min_pad)
+    pad_x = max(int(tile_w * overlap), min_pad)
+
+    tiles = []
+    for r in range(rows):
+        for c in range(cols):
+            core_y0, core_y1 = r * tile_h, min(height, (r + 1) * tile_h)
+            core_x0, core_x1 = c * tile_w, min(width, (c + 1) * tile_w)
+            if core_y1 <= core_y0 or core_x1 <= core_x0:
+                continue
+
+            y0, y1 = max(0, core_y0 - pad_y), min(height, core_y1 + pad_y)
+            x0, x1 = max(0, core_x0 - pad_x), min(width, core_x1 + pad_x)
+            tiles.append(
+                (image[y0:y1, x0:x1], (x0, y0), (core_x0, core_y0, core_x1, core_y1))
+            )
+    return tiles
+
+
+def merge_tile_results(
+    tile_results: list[list],
+    tiles: list[tuple[np.ndarray, tuple[int, int], tuple[int, int, int, int]]],
+) -> list:
+    """
+    Shift per-tile detections back into image coordinates. A detection is kept only
+    by the tile whose core region contains its center, which drops both the duplicates
+    and the truncated words produced in the overlap between neighbouring tiles.
+    """
+    merged = []
+    for detections, (_, (x_off, y_off), (cx0, cy0, cx1, cy1)) in zip(tile_results, tiles):
+        for coords, text, prob in detections:
+            shifted = [[x + x_off, y + y_off] for x, y in coords]
+            center_x = sum(x for x, _ in shifted) / len(shifted)
+            center_y = sum(y for _, y in shifted) / len(shifted)
+            if cx0 <= center_x < cx1 and cy0 <= center_y < cy1:
+                merged.append((shifted, text, prob))
+    return merged
+
+
+@lru_cache(maxsize=4)
+def get_reader(languages: tuple[str, ...], gpu: bool = False):
+    """
+    Return the EasyOCR reader for a language set, building it on first use.
+    Model loading takes seconds, so a worker process keeps one reader per
+    configuration for every task it runs.
+
+    :param languages: Tuple of language codes, in the order given to EasyOCR.
+    :param gpu: Whether the reader runs its models on the GPU.
+    """
+    # Imported here: easyocr pulls in torch, which the API process and
+    # non-OCR tasks never need
+    import easyocr
+
+    logger.info("Loading EasyOCR reader for %s (gpu=%s)", languages, gpu)
+    return easyocr.Reader(lang_list=list(languages), gpu=gpu, verbose=False)
+
+
+def _to_gray(image: np.ndarray) -> np.ndarray:
+    """Return a single-channel uint8 view of a grayscale, BGR or BGRA image."""
+    # EasyOCR normalises pixels assuming a 0-255 range: keep the high byte of
+    # 16-bit scans (decoded unchanged for the colour steps)
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    elif image.dtype != np.uint8:
+        image = cv2.convertScaleAbs(image)
+    if image.ndim == 2:
+        return image
+    if image.shape[2] == 4:
+        return cv2.cvtColor(image, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def extract_text(image: np.ndarray, languages: list[str], gpu_acc: bool = False, reader=None) -> tuple[list, np.ndarray]:
     """
     Wrapper method handling the text extraction logic. This is mainly to reduce
     the memory overhead as this method is very much resource intensive, and it is
@@ -17,17 +122,18 @@ def extract_text(image: np.ndarray, languages: list[str], gpu_acc: bool = False)
     :param image_name: Name of the image file.
     :param languages: List of language codes to use for text extraction.
     :param gpu_acc: Whether a GPU is available to accelerate image analysis.
+    :param reader: EasyOCR reader to use, defaults to the cached one from get_reader.
     :return: values, clean_image: Returns a tuple of the text information and the pixel
         array of the image, devoid of text.
     """
     logger.debug("Initiating text extraction")
-    extractor = TextExtraction(img=image,lang=languages, gpu_acc=gpu_acc)
+    extractor = TextExtraction(img=image,lang=languages, gpu_acc=gpu_acc, reader=reader)
     extractor.check_language_code_validity()
 
     text_info =  extractor.read_text_from_image()
-    #TODO : image cleaning, just send a copy for now
+    #TODO : image cleaning, just send the input back for now (callers treat it as read-only)
     #clean_image = extractor.remove_text_from_image(image, text_info)
-    clean_image = copy.deepcopy(image)
+    clean_image = image
 
     logger.debug("Completed text extraction")
     return text_info, clean_image
@@ -70,31 +176,52 @@ class TextExtraction:
     image: np.ndarray
 
     # Class members
-    def __init__(self, img, lang: list[str] = ['en', 'fr'], gpu_acc: bool = False):
+    def __init__(self, img, lang: list[str] = ['en', 'fr'], gpu_acc: bool = False, reader=None):
         self.image      : np.ndarray    = img
         self.lang       : list[str]     = list(lang)
         self.gpu_acc    : bool          = gpu_acc
+        self.reader                     = reader
 
     # Class methods
     def read_text_from_image(self, scale_xy: tuple[float, float] = (2.0,2.0)):
 
-        reader = easyocr.Reader(
-            lang_list=list(self.lang),
-            gpu=self.gpu_acc,
-            verbose=False
-        )
+        reader = self.reader or get_reader(tuple(self.lang), self.gpu_acc)
 
-        shading = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        shading = _to_gray(self.image)
+
+        # Cap the effective scale so the uint8 buffer fed to OCR never exceeds OCR_MAX_SIDE
+        h, w = shading.shape[:2]
+        cap = min(1.0, OCR_MAX_SIDE / max(h * scale_xy[1], w * scale_xy[0]))
+        scale_xy = (scale_xy[0] * cap, scale_xy[1] * cap)
+        interpolation = cv2.INTER_LANCZOS4 if min(scale_xy) >= 1.0 else cv2.INTER_AREA
 
         # NOTE: resizing MUST implies scaling the resulting text or the proportion won't match the original image
-        upscaling = cv2.resize(shading, None, fx=scale_xy[0], fy=scale_xy[1], interpolation=cv2.INTER_LANCZOS4)
+        upscaling = cv2.resize(shading, None, fx=scale_xy[0], fy=scale_xy[1], interpolation=interpolation)
+
+        read = partial(reader.readtext,
+                       text_threshold=0.7,  # Slightly higher threshold
+                       low_text=0.4,  # low res text detection
+                       link_threshold=0.4,  # character linking tolerance
+                       width_ths=0.7,  # character  spacing tolerance
+                       height_ths=0.7)
 
-        extracted_text = reader.readtext(upscaling,
-                                  text_threshold=0.7,  # Slightly higher threshold
-                                  low_text=0.4,  # low res text detection
-                                  link_threshold=0.4,  # character linking tolerance
-                                  width_ths=0.7,  # character  spacing tolerance
-                                  height_ths=0.7)
+        if not self.gpu_acc or max(h, w) <= OCR_TILE_MIN_SIDE:
+            extracted_text = read(upscaling)
+        else:
+            # Large maps on GPU: OCR overlapping tiles concurrently. The tiles
+            # share one reader: readtext only reads the Reader's attributes and
+            # runs its models in eval mode under torch.no_grad, so concurrent
+            # calls don't mutate shared state, and inference releases the GIL.
+            tiles = split_into_tiles(
+                upscaling,
+                *OCR_TILE_GRID,
+                overlap=OCR_TILE_OVERLAP,
+                min_pad=OCR_TILE_MIN_OVERLAP_PX,
+            )
+            workers = min(len(tiles), OCR_TILE_MAX_WORKERS)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                tile_results = list(executor.map(read, [tile for tile, _, _ in tiles]))
+            extracted_text = merge_tile_results(tile_results, tiles)
 
         scaled_extracted_text = []
         for (coords, text, prob) in extracted_text:
@@ -107,25 +234,25 @@ class TextExtraction:
 
             scaled_extracted_text.append((rescaled_coords, text, prob))
 
-        logger.debug(f"Extracted text: \n{extracted_text}")
+        logger.debug("Extracted text: \n%s", extracted_text)
 
         return scaled_extracted_text
 
 
     def remove_text_from_image(self, text_info: list):
 
-        image_no_text: np.ndarray = copy.deepcopy(self.image)
+        image_no_text: np.ndarray = self.image.copy()
         return image_no_text
 
     def draw_bounding_box(self, scaled_extracted_text) -> np.ndarray:
 
-        image_with_boxes: np.ndarray = copy.deepcopy(self.image)
+        image_with_boxes: np.ndarray = self.image.copy()
 
         # Results and drawing bounding boxes
         for bbox, text, conf in scaled_extracted_text:
 
             # Convert to numpy array for cv2.polylines
-            boxes = np.array(image_with_boxes, dtype=np.int32)
+            boxes = np.array(bbox, dtype=np.int32)
 
             # Draw red bounding box (thickness=2, red color in BGR format)
             cv2.polylines(image_with_boxes, [boxes], isClosed=True, color=(0, 0, 255), thickness=2)
@@ -147,7 +274,7 @@ class TextExtraction:
         #cv2.imwrite(output_path, image_with_boxes)
         #print(f"Saved image with bounding boxes: {output_path}")
 
-        return results
+        return image_with_boxes
 
     def check_language_code_validity(self) -> None:
         """
@@ -25,3 +25,12 @@ def test_celery_task_routes():
     assert "app.tasks.process_map" in routes
     assert routes["app.tasks.process_map"]["queue"] == "maps"
     assert routes.get("app.tasks.something_else", {"queue": "default"})["queue"] == "default"
+
+def test_celery_map_extraction_routed_to_maps_queue():
+    router = celery_app.amqp.router
+    route = router.route({}, "app.tasks.process_map_extraction")
+    assert route["queue"].name == "maps"
+    assert router.route({}, "app.tasks.test_task")["queue"].name == "default"
+
+def test_celery_prefetch_one_task_per_process():
+    assert celery_app.conf.worker_prefetch_multiplier == 1
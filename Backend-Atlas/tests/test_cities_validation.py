@@ -0,0 +1,53 @@
+from unittest.mock import patch
+
+from app.utils import cities_validation
+
+
+def test_city_map_snapshot_is_written_then_reused(tmp_path):
+    cache_path = str(tmp_path / "citymap.pkl")
+    fake_map = {"quebec": [{"name": "Québec", "lat": 46.8, "lon": -71.2}]}
+
+    with patch.object(
+        cities_validation, "_build_city_map", return_value=fake_map
+    ) as mock_build:
+        first = cities_validation._load_city_map(cache_path)
+        second = cities_validation._load_city_map(cache_path)
+
+    assert first == second == fake_map
+    mock_build.assert_called_once()
+    assert [p.name for p in tmp_path.iterdir()] == ["citymap.pkl"]
+
+
+def test_unreadable_city_map_snapshot_is_rebuilt(tmp_path):
+    cache_path = tmp_path / "citymap.pkl"
+    cache_path.write_bytes(b"not a pickle")
+    fake_map = {"paris": [{"name": "Paris", "lat": 48.9, "lon": 2.3}]}
+
+    with patch.object(cities_validation, "_build_city_map", return_value=fake_map):
+        assert cities_validation._load_city_map(str(cache_path)) == fake_map
+    assert cities_validation._load_city_map(str(cache_path)) == fake_map
+
+
+def test_search_cities_matches_geonamescache_contains_search():
+    for query in ["Québec", "saint-", "mont", "ny", "zzzq"]:
+        expected = cities_validation._gc.search_cities(
+            query, case_sensitive=False, contains_search=True
+        )
+        assert cities_validation._search_cities(query) == expected
+
+
+class _NoScan(list):
+    def __getitem__(self, item):
+        raise AssertionError("record scanned")
+
+
+def test_search_cities_with_unseen_trigram_returns_nothing_without_scanning():
+    records, haystacks, index, generic = cities_validation._alternate_name_index()
+    assert "n§§" not in index and "n§§" not in generic
+
+    with patch.object(
+        cities_validation,
+        "_alternate_name_index",
+        return_value=(records, _NoScan(haystacks), index, generic),
+    ):
+        assert cities_validation._search_cities("Mon§§") == []
@@ -0,0 +1,22 @@
+import cv2
+import numpy as np
+from shapely.geometry import shape
+
+from app.utils.color_extraction import extract_colors
+
+
+def test_extract_colors_downscaled_geometry_matches_original_pixels(tmp_path):
+    img = np.full((400, 400, 3), 255, dtype=np.uint8)
+    img[100:300, 100:300] = (0, 0, 200)  # BGR red square
+    image_path = tmp_path / "square.png"
+    cv2.imwrite(str(image_path), img)
+
+    kwargs = dict(imposed_click_positions=[(0.5, 0.5)], imposed_sampling_radii=[5])
+    full = extract_colors(str(image_path), **kwargs)
+    reduced = extract_colors(str(image_path), max_working_side=100, **kwargs)
+
+    full_bounds = shape(full["pixel_features"][0]["features"][0]["geometry"]).bounds
+    reduced_bounds = shape(reduced["pixel_features"][0]["features"][0]["geometry"]).bounds
+
+    assert np.allclose(full_bounds, (100, 100, 300, 300), atol=3)
+    assert np.allclose(reduced_bounds, full_bounds, atol=6)
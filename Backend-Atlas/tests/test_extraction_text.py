@@ -1,5 +1,15 @@
-from app.utils.text_extraction import extract_text
+from app.utils.text_extraction import (
+    TextExtraction,
+    extract_text,
+    get_reader,
+    merge_tile_results,
+    split_into_tiles,
+)
+from unittest.mock import MagicMock, patch
+import sys
 from pathlib import Path
+import cv2
+import numpy as np
 import pytest
 
 def get_images():
@@ -33,3 +43,126 @@ def test_text_extraction(image_path):
 
     assert image_path.exists()
 
+
+
+def test_split_into_tiles_cores_cover_image_once():
+    image = np.zeros((103, 97), dtype=np.uint8)
+    tiles = split_into_tiles(image, rows=4, cols=4, overlap=0.1)
+
+    coverage = np.zeros(image.shape, dtype=np.int32)
+    for tile, (x_off, y_off), (cx0, cy0, cx1, cy1) in tiles:
+        assert x_off <= cx0 and y_off <= cy0
+        assert x_off + tile.shape[1] >= cx1 and y_off + tile.shape[0] >= cy1
+        coverage[cy0:cy1, cx0:cx1] += 1
+
+    assert np.all(coverage == 1)
+
+
+def test_merge_tile_results_offsets_and_drops_overlap_duplicates():
+    image = np.zeros((100, 100), dtype=np.uint8)
+    tiles = split_into_tiles(image, rows=1, cols=2, overlap=0.2)
+    (_, (left_x, _), _), (_, (right_x, _), _) = tiles
+
+    # The same word (centered at x=45) is seen by both tiles.
+    box = [[40, 10], [50, 10], [50, 20], [40, 20]]
+    left = [(box, "Quebec", 0.9)]
+    right = [([[x - right_x, y] for x, y in box], "Quebec", 0.8)]
+
+    merged = merge_tile_results([left, right], tiles)
+
+    assert merged == [([[x + left_x, y] for x, y in box], "Quebec", 0.9)]
+
+
+def test_get_reader_builds_one_reader_per_configuration():
+    fake_easyocr = MagicMock()
+    get_reader.cache_clear()
+    try:
+        with patch.dict(sys.modules, {"easyocr": fake_easyocr}):
+            first = get_reader(("en", "fr"), False)
+            assert get_reader(("en", "fr"), False) is first
+            get_reader(("en",), False)
+    finally:
+        get_reader.cache_clear()
+
+    assert fake_easyocr.Reader.call_count == 2
+
+
+def test_draw_bounding_box_draws_on_a_copy():
+    image = np.zeros((60, 120, 3), dtype=np.uint8)
+    image.flags.writeable = False
+    detections = [([[10, 20], [50, 20], [50, 40], [10, 40]], "Hi", 0.9)]
+
+    boxed = TextExtraction(image).draw_bounding_box(detections)
+
+    assert boxed.shape == image.shape
+    assert boxed[20, 30, 2] == 255  # red edge of the box
+    assert not image.any()
+
+
+def _fake_readtext(tile, **kwargs):
+    """Report every white blob of a tile as one detected label."""
+    count, _, stats, _ = cv2.connectedComponentsWithStats((tile > 127).astype(np.uint8))
+    detections = []
+    for x, y, w, h, _ in stats[1:count]:
+        box = [[x, y], [x + w, y], [x + w, y + h], [x, y + h]]
+        detections.append((box, "label", 0.9))
+    return detections
+
+
+def test_label_straddling_a_tile_seam_is_read_whole():
+    # Large enough to be tiled on GPU; the label crosses the first column seam
+    # by more than the fractional overlap on each side.
+    image = np.zeros((400, 2400), dtype=np.uint8)
+    image[170:190, 500:700] = 255
+    reader = MagicMock()
+    reader.readtext.side_effect = _fake_readtext
+
+    detections = TextExtraction(
+        image, gpu_acc=True, reader=reader
+    ).read_text_from_image()
+
+    assert reader.readtext.call_count > 1
+    assert len(detections) == 1
+    box, text, _ = detections[0]
+    xs = [x for x, _ in box]
+    assert text == "label"
+    assert abs(min(xs) - 500) <= 2 and abs(max(xs) - 700) <= 2
+
+
+def test_tiling_threshold_applies_to_the_source_size():
+    # Upscaled past OCR_TILE_MIN_SIDE, but the source is small enough for one pass
+    image = np.zeros((300, 1500), dtype=np.uint8)
+    reader = MagicMock()
+    reader.readtext.return_value = []
+
+    TextExtraction(image, gpu_acc=True, reader=reader).read_text_from_image()
+
+    reader.readtext.assert_called_once()
+
+
+def test_cpu_reader_reads_large_maps_in_a_single_pass():
+    image = np.zeros((400, 2400), dtype=np.uint8)
+    image[170:190, 500:700] = 255
+    reader = MagicMock()
+    reader.readtext.side_effect = _fake_readtext
+
+    detections = TextExtraction(image, reader=reader).read_text_from_image()
+
+    reader.readtext.assert_called_once()
+    assert reader.readtext.call_args.args[0].shape[1] > 2400
+    assert len(detections) == 1
+
+
+def test_sixteen_bit_images_reach_the_reader_as_uint8():
+    # 16-bit scans are decoded unchanged for the colour steps
+    image = np.full((50, 80, 3), 0x8000, dtype=np.uint16)
+    image[10:20, 10:40] = 0xFFFF
+    reader = MagicMock()
+    reader.readtext.return_value = []
+
+    TextExtraction(image, reader=reader).read_text_from_image(scale_xy=(1.0, 1.0))
+
+    ocr_input = reader.readtext.call_args.args[0]
+    assert ocr_input.dtype == np.uint8
+    assert ocr_input[0, 0] == 128
+    assert ocr_input[15, 20] == 255
@@ -0,0 +1,35 @@
+import asyncio
+import uuid
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.models.features import Feature
+from app.services.features import insert_features_bulk
+
+
+def test_insert_features_bulk_uses_multi_row_insert_without_psycopg():
+    project_id = uuid.uuid4()
+    map_id = uuid.uuid4()
+    data = [{"type": "FeatureCollection", "features": [{"id": i}]} for i in range(3)]
+
+    connection = MagicMock()
+    connection.dialect.driver = "asyncpg"
+    connection.get_raw_connection = AsyncMock()
+    db = MagicMock()
+    db.connection = AsyncMock(return_value=connection)
+    db.execute = AsyncMock()
+    db.commit = AsyncMock()
+
+    with patch(
+        "app.services.features._validate_feature_owner",
+        AsyncMock(return_value=project_id),
+    ):
+        ids = asyncio.run(insert_features_bulk(db, map_id, data, project_id))
+
+    connection.get_raw_connection.assert_not_called()
+    db.execute.assert_awaited_once()
+    statement, rows = db.execute.call_args.args
+    assert statement.is_insert and statement.table.name == Feature.__tablename__
+    assert [row["data"] for row in rows] == data
+    assert all(row["project_id"] == project_id and row["map_id"] == map_id for row in rows)
+    assert [row["id"] for row in rows] == [uuid.UUID(i) for i in ids]
+    db.commit.assert_awaited_once()
@@ -0,0 +1,29 @@
+from unittest.mock import patch
+
+import cv2
+import numpy as np
+
+from app.utils.file_utils import encode_grayscale_png
+
+
+def test_encode_grayscale_png_shrinks_colour_png():
+    image = np.zeros((64, 64, 3), dtype=np.uint8)
+    image[:, :32] = (10, 200, 30)
+    ok, encoded = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 0])
+    assert ok
+
+    result = encode_grayscale_png(encoded.tobytes())
+
+    assert result is not None
+    assert len(result) < encoded.nbytes
+    assert cv2.imdecode(np.frombuffer(result, np.uint8), cv2.IMREAD_UNCHANGED).ndim == 2
+
+
+def test_encode_grayscale_png_skips_jpeg_without_decoding():
+    image = np.full((64, 64, 3), 128, dtype=np.uint8)
+    ok, encoded = cv2.imencode(".jpg", image)
+    assert ok
+
+    with patch("app.utils.file_utils.cv2.imdecode") as mock_imdecode:
+        assert encode_grayscale_png(encoded.tobytes()) is None
+    mock_imdecode.assert_not_called()
@@ -0,0 +1,35 @@
+import numpy as np
+from shapely.geometry import MultiLineString, Point
+from shapely.ops import nearest_points
+
+from app.utils.georeferencingSift import (
+    _build_coastline_index,
+    _snap_ring_coords_to_coastline,
+)
+
+
+def test_indexed_snapping_matches_whole_coastline():
+    xs = np.linspace(0.0, 1000.0, 500)
+    coastline = MultiLineString(
+        [
+            np.column_stack((xs, 10.0 * np.sin(xs / 50.0))),
+            np.column_stack((xs, 300.0 + 5.0 * np.cos(xs / 30.0))),
+        ]
+    )
+    rng = np.random.default_rng(0)
+    ring = [tuple(p) for p in rng.uniform((0.0, -50.0), (1000.0, 350.0), (40, 2))]
+    ring.append(ring[0])
+    tolerance = 40.0
+
+    snapped, total, _ = _snap_ring_coords_to_coastline(
+        ring, _build_coastline_index(coastline), tolerance
+    )
+
+    assert total == len(ring)
+    for (x, y), (sx, sy) in zip(ring[:-1], snapped[:-1]):
+        point = Point(x, y)
+        if point.distance(coastline) <= tolerance:
+            expected = nearest_points(point, coastline)[1]
+            assert np.allclose((sx, sy), (expected.x, expected.y))
+        else:
+            assert (sx, sy) == (x, y)
@@ -0,0 +1,23 @@
+from unittest.mock import patch
+
+from app import keycloak
+
+
+def test_public_key_fetched_once_within_ttl():
+    keycloak._public_key_cache = None
+    try:
+        with patch.object(
+            keycloak.keycloak_open_id, "public_key", return_value="abc"
+        ) as mock_public_key:
+            first = keycloak.get_keycloak_public_key()
+            second = keycloak.get_keycloak_public_key()
+
+            assert first == second
+            assert "abc" in first
+            mock_public_key.assert_called_once()
+
+            with patch("app.keycloak.time.monotonic", return_value=1e12):
+                keycloak.get_keycloak_public_key()
+            assert mock_public_key.call_count == 2
+    finally:
+        keycloak._public_key_cache = None
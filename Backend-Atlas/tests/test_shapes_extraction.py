@@ -2,6 +2,7 @@ import json
 import os
 from typing import Dict, List
 
+import cv2
 import pytest
 from app.utils.shapes_extraction import extract_shapes
 from shapely.geometry import Polygon
@@ -83,14 +84,17 @@ def find_matching_shape(
         ),
     ],
 )
-def test_shape_extraction_golden_master(golden_file, image_path):
+@pytest.mark.parametrize("decoded", [False, True], ids=["path", "array"])
+def test_shape_extraction_golden_master(golden_file, image_path, decoded):
     assert os.path.exists(golden_file), f"Golden file not found: {golden_file}"
     with open(golden_file, "r", encoding="utf-8") as f:
         golden_data = json.load(f)
 
     assert os.path.exists(image_path), f"Image not found: {image_path}"
 
-    result = extract_shapes(image_path, debug=False)
+    # The worker hands extract_shapes the array it decoded with cv2
+    image = cv2.imread(image_path, cv2.IMREAD_UNCHANGED) if decoded else image_path
+    result = extract_shapes(image, debug=False)
     extracted_shapes = result["shapes"]
 
     extracted_polys = []
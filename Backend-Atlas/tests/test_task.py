@@ -1,9 +1,13 @@
+import time
 import uuid
-from unittest.mock import patch, MagicMock, mock_open
+import asyncio
+from unittest.mock import AsyncMock, patch, MagicMock
 
 import numpy as np
 import pytest
-from app.tasks import process_map_extraction
+from app.tasks import persist_features, process_map_extraction
+
+FAKE_PNG_BYTES = b"\x89PNG\r\n\x1a\nfake_image_data"
 
 
 @pytest.fixture
@@ -58,7 +62,7 @@ def get_mock_color_extraction():
 
 def test_process_map_extraction(real_image_np):
     filename = "test_map.png"
-    file_bytes = b"fake_image_data"
+    file_bytes = FAKE_PNG_BYTES
     project_id = str(uuid.uuid4())
     map_id = str(uuid.uuid4())
 
@@ -74,32 +78,26 @@ def test_process_map_extraction(real_image_np):
 
     with (
         patch("app.tasks.process_map_extraction.update_state") as mock_update_state,
-        patch("app.tasks.cv2.imread", return_value=real_image_np),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
         patch("app.tasks.extract_text", return_value=(mock_ocr_result, real_image_np)),
         patch("app.tasks.extract_colors", return_value=mock_colors),
         patch("app.tasks.extract_shapes", return_value=mock_shapes),
-        patch("app.tasks.asyncio.run") as mock_asyncio_run,
+        patch("app.tasks._run_async") as mock_run_async,
         patch(
-            "app.tasks.find_first_city",
+            "app.tasks.find_cities_batch",
             return_value={
-                "found": False,
-                "query": "test",
-                "name": "test",
-                "lat": 0.0,
-                "lon": 0.0,
+                "test": {
+                    "found": False,
+                    "query": "test",
+                    "name": "test",
+                    "lat": 0.0,
+                    "lon": 0.0,
+                },
             },
         ),
-        patch("tempfile.NamedTemporaryFile") as mock_tempfile,
         patch("os.makedirs"),
-        patch("os.unlink"),
-        patch("builtins.open", mock_open()),
+        patch("app.tasks.write_text_file"),
     ):
-        mock_tmp_file = MagicMock()
-        mock_tmp_file.name = "/tmp/test_map.png"
-        mock_tmp_file.__enter__ = MagicMock(return_value=mock_tmp_file)
-        mock_tmp_file.__exit__ = MagicMock(return_value=None)
-        mock_tempfile.return_value = mock_tmp_file
-
         # Call with all extraction options enabled
         result = process_map_extraction.apply(
             args=[filename, file_bytes, project_id, map_id],
@@ -130,31 +128,26 @@ def test_process_map_extraction(real_image_np):
 
     # Verify mocks were called appropriately
     assert mock_update_state.call_count >= 5  # At least 5 progress updates
-    assert mock_asyncio_run.call_count >= 1  # At least one async persist call
+    metas = [c.kwargs["meta"] for c in mock_update_state.call_args_list]
+    assert [m["current"] for m in metas] == [1, 2, 3, 4, 5]
+    assert all(m["total"] == 5 for m in metas)
+    assert mock_run_async.call_count >= 1  # At least one async persist call
 
 
 def test_process_map_extraction_minimal(real_image_np):
     """Test with all extractions disabled"""
     filename = "test_map.png"
-    file_bytes = b"fake_image_data"
+    file_bytes = FAKE_PNG_BYTES
     project_id = str(uuid.uuid4())
     map_id = str(uuid.uuid4())
 
     with (
         patch("app.tasks.process_map_extraction.update_state"),
-        patch("app.tasks.cv2.imread", return_value=real_image_np),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
         patch("app.tasks.extract_text") as mock_extract_text,
         patch("app.tasks.extract_colors") as mock_extract_colors,
         patch("app.tasks.extract_shapes") as mock_extract_shapes,
-        patch("tempfile.NamedTemporaryFile") as mock_tempfile,
-        patch("os.unlink"),
     ):
-        mock_tmp_file = MagicMock()
-        mock_tmp_file.name = "/tmp/test_map.png"
-        mock_tmp_file.__enter__ = MagicMock(return_value=mock_tmp_file)
-        mock_tmp_file.__exit__ = MagicMock(return_value=None)
-        mock_tempfile.return_value = mock_tmp_file
-
         # Call with all extraction options disabled
         result = process_map_extraction.apply(
             args=[filename, file_bytes, project_id, map_id],
@@ -180,7 +173,7 @@ def test_process_map_extraction_forwards_imposed_click_positions(real_image_np):
     """extract_colors must receive imposed_click_positions and imposed_colors_names
     exactly as passed to process_map_extraction."""
     filename = "test_map.png"
-    file_bytes = b"fake_image_data"
+    file_bytes = FAKE_PNG_BYTES
     project_id = str(uuid.uuid4())
     map_id = str(uuid.uuid4())
 
@@ -191,7 +184,7 @@ def test_process_map_extraction_forwards_imposed_click_positions(real_image_np):
 
     with (
         patch("app.tasks.process_map_extraction.update_state"),
-        patch("app.tasks.cv2.imread", return_value=real_image_np),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
         patch(
             "app.tasks.extract_colors", return_value=mock_colors
         ) as mock_extract_colors,
@@ -199,16 +192,8 @@ def test_process_map_extraction_forwards_imposed_click_positions(real_image_np):
             "app.tasks.extract_shapes",
             return_value={"shapes": [], "normalized_features": []},
         ),
-        patch("app.tasks.asyncio.run"),
-        patch("tempfile.NamedTemporaryFile") as mock_tempfile,
-        patch("os.unlink"),
+        patch("app.tasks._run_async"),
     ):
-        mock_tmp_file = MagicMock()
-        mock_tmp_file.name = "/tmp/test_map.png"
-        mock_tmp_file.__enter__ = MagicMock(return_value=mock_tmp_file)
-        mock_tmp_file.__exit__ = MagicMock(return_value=None)
-        mock_tempfile.return_value = mock_tmp_file
-
         process_map_extraction.apply(
             args=[filename, file_bytes, project_id, map_id],
             kwargs={
@@ -230,7 +215,7 @@ def test_process_map_extraction_forwards_imposed_click_positions(real_image_np):
 def test_process_map_extraction_forwards_imposed_sampling_radii(real_image_np):
     """If per-click sampling radii are provided, they must be forwarded to extract_colors."""
     filename = "test_map.png"
-    file_bytes = b"fake_image_data"
+    file_bytes = FAKE_PNG_BYTES
     project_id = str(uuid.uuid4())
     map_id = str(uuid.uuid4())
 
@@ -242,7 +227,7 @@ def test_process_map_extraction_forwards_imposed_sampling_radii(real_image_np):
 
     with (
         patch("app.tasks.process_map_extraction.update_state"),
-        patch("app.tasks.cv2.imread", return_value=real_image_np),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
         patch(
             "app.tasks.extract_colors", return_value=mock_colors
         ) as mock_extract_colors,
@@ -250,16 +235,8 @@ def test_process_map_extraction_forwards_imposed_sampling_radii(real_image_np):
             "app.tasks.extract_shapes",
             return_value={"shapes": [], "normalized_features": []},
         ),
-        patch("app.tasks.asyncio.run"),
-        patch("tempfile.NamedTemporaryFile") as mock_tempfile,
-        patch("os.unlink"),
+        patch("app.tasks._run_async"),
     ):
-        mock_tmp_file = MagicMock()
-        mock_tmp_file.name = "/tmp/test_map.png"
-        mock_tmp_file.__enter__ = MagicMock(return_value=mock_tmp_file)
-        mock_tmp_file.__exit__ = MagicMock(return_value=None)
-        mock_tempfile.return_value = mock_tmp_file
-
         process_map_extraction.apply(
             args=[filename, file_bytes, project_id, map_id],
             kwargs={
@@ -283,7 +260,7 @@ def test_process_map_extraction_no_imposed_colors_forwards_none(real_image_np):
     """When imposed_click_positions is omitted and no legend shapes are available,
     color extraction is skipped and extract_colors is not called."""
     filename = "test_map.png"
-    file_bytes = b"fake_image_data"
+    file_bytes = FAKE_PNG_BYTES
     project_id = str(uuid.uuid4())
     map_id = str(uuid.uuid4())
 
@@ -291,7 +268,7 @@ def test_process_map_extraction_no_imposed_colors_forwards_none(real_image_np):
 
     with (
         patch("app.tasks.process_map_extraction.update_state"),
-        patch("app.tasks.cv2.imread", return_value=real_image_np),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
         patch(
             "app.tasks.extract_colors", return_value=mock_colors
         ) as mock_extract_colors,
@@ -299,16 +276,8 @@ def test_process_map_extraction_no_imposed_colors_forwards_none(real_image_np):
             "app.tasks.extract_shapes",
             return_value={"shapes": [], "normalized_features": []},
         ),
-        patch("app.tasks.asyncio.run"),
-        patch("tempfile.NamedTemporaryFile") as mock_tempfile,
-        patch("os.unlink"),
+        patch("app.tasks._run_async"),
     ):
-        mock_tmp_file = MagicMock()
-        mock_tmp_file.name = "/tmp/test_map.png"
-        mock_tmp_file.__enter__ = MagicMock(return_value=mock_tmp_file)
-        mock_tmp_file.__exit__ = MagicMock(return_value=None)
-        mock_tempfile.return_value = mock_tmp_file
-
         process_map_extraction.apply(
             args=[filename, file_bytes, project_id, map_id],
             kwargs={
@@ -319,3 +288,137 @@ def test_process_map_extraction_no_imposed_colors_forwards_none(real_image_np):
         ).get(timeout=20)
 
     mock_extract_colors.assert_not_called()
+
+
+def test_persist_features_falls_back_to_row_inserts_when_bulk_fails():
+    project_id = uuid.uuid4()
+    map_id = uuid.uuid4()
+    collections = [
+        {"type": "FeatureCollection", "features": [{"id": 1}, {"id": 2}]},
+        {"type": "FeatureCollection", "features": [{"id": 3}]},
+    ]
+
+    with (
+        patch(
+            "app.tasks.insert_features_bulk", AsyncMock(side_effect=RuntimeError)
+        ) as mock_bulk,
+        patch("app.tasks.insert_feature_in_db", AsyncMock()) as mock_row,
+    ):
+        asyncio.run(persist_features(MagicMock(), project_id, map_id, collections))
+
+    rows = mock_bulk.call_args.kwargs["data"]
+    assert [row["features"] for row in rows] == [[{"id": 1}], [{"id": 2}], [{"id": 3}]]
+    assert [c.kwargs["data"] for c in mock_row.call_args_list] == rows
+
+
+def test_process_map_extraction_rejects_extension_before_decoding():
+    with (
+        patch("app.tasks.process_map_extraction.update_state"),
+        patch("app.tasks.cv2.imdecode") as mock_imdecode,
+        patch("app.tasks._run_async"),
+    ):
+        result = process_map_extraction.apply(
+            args=["map.gif", FAKE_PNG_BYTES, uuid.uuid4(), uuid.uuid4()],
+        )
+
+    with pytest.raises(ValueError, match="Extension .gif is not allowed"):
+        result.get(timeout=20)
+    mock_imdecode.assert_not_called()
+
+
+def test_process_map_extraction_persists_only_matched_cities_once(real_image_np):
+    mock_ocr_result = [
+        ([0, 0], "QUEBEC Quebec Québec", 0.99),
+        ([1, 1], "Hello montreal Xyzzyville", 0.95),
+    ]
+
+    with (
+        patch("app.tasks.process_map_extraction.update_state"),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
+        patch("app.tasks.extract_text", return_value=(mock_ocr_result, real_image_np)),
+        patch("app.tasks.persist_features") as mock_persist,
+        patch("app.tasks._run_async"),
+        patch("app.tasks.write_text_file"),
+    ):
+        process_map_extraction.apply(
+            args=["test_map.png", FAKE_PNG_BYTES, uuid.uuid4(), uuid.uuid4()],
+            kwargs={
+                "enable_color_extraction": False,
+                "enable_shapes_extraction": False,
+                "enable_text_extraction": True,
+            },
+        ).get(timeout=20)
+
+    mock_persist.assert_called_once()
+    collections = mock_persist.call_args.args[3]
+    names = [fc["features"][0]["properties"]["name"] for fc in collections]
+    assert names == ["Québec"]
+
+
+def test_process_map_extraction_skips_city_lookup_without_text(real_image_np):
+    with (
+        patch("app.tasks.process_map_extraction.update_state"),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
+        patch("app.tasks.extract_text", return_value=([([0, 0], "  12 ", 0.4)], real_image_np)),
+        patch("app.tasks.find_cities_batch") as mock_find_cities,
+        patch("app.tasks._run_async") as mock_run_async,
+        patch("app.tasks.write_text_file"),
+    ):
+        process_map_extraction.apply(
+            args=["test_map.png", FAKE_PNG_BYTES, uuid.uuid4(), uuid.uuid4()],
+            kwargs={
+                "enable_color_extraction": False,
+                "enable_shapes_extraction": False,
+                "enable_text_extraction": True,
+            },
+        ).get(timeout=20)
+
+    mock_find_cities.assert_not_called()
+    # Only the session close goes through the event loop
+    assert mock_run_async.call_count == 1
+
+
+def test_process_map_extraction_rejects_content_without_image_signature():
+    with (
+        patch("app.tasks.process_map_extraction.update_state"),
+        patch("app.tasks.cv2.imdecode") as mock_imdecode,
+        patch("app.tasks._run_async"),
+    ):
+        result = process_map_extraction.apply(
+            args=["map.png", b"GIF89a fake", uuid.uuid4(), uuid.uuid4()],
+        )
+
+    with pytest.raises(ValueError, match="is not a PNG or JPEG image"):
+        result.get(timeout=20)
+    mock_imdecode.assert_not_called()
+
+
+def test_process_map_extraction_waits_for_colour_job_when_a_step_fails(real_image_np):
+    finished = []
+
+    def slow_extract_colors(*args, **kwargs):
+        time.sleep(0.2)
+        finished.append(True)
+        return get_mock_color_extraction()
+
+    with (
+        patch("app.tasks.process_map_extraction.update_state"),
+        patch("app.tasks.cv2.imdecode", return_value=real_image_np),
+        patch("app.tasks.extract_colors", side_effect=slow_extract_colors),
+        patch("app.tasks.extract_shapes", side_effect=RuntimeError("shapes failed")),
+        patch("app.tasks._run_async"),
+    ):
+        result = process_map_extraction.apply(
+            args=["test_map.png", FAKE_PNG_BYTES, uuid.uuid4(), uuid.uuid4()],
+            kwargs={
+                "enable_color_extraction": True,
+                "enable_shapes_extraction": True,
+                "enable_text_extraction": False,
+                "imposed_click_positions": [(0.5, 0.5)],
+            },
+        )
+
+    with pytest.raises(RuntimeError, match="shapes failed"):
+        result.get(timeout=20)
+    # The task only fails once the colour job it started has finished
+    assert finished == [True]